@@ -0,0 +1,118 @@
+import json
+import os
+import re
+import threading
+from bisect import bisect_left
+
+# Queries and index texts are compared without case, whitespace and dots, so
+# "BVerfGE 7, 19", "bverfge7,19" and "Art 5" match "BVerfGE7,198" and "Art. 5 GG"
+NORMALIZE_PATTERN = re.compile(r'[\s.]+')
+
+def normalize(text):
+    return NORMALIZE_PATTERN.sub('', text.casefold())
+
+class PrefixIndex:
+    """Prefix index over the entries written by load_autocomplete.py.
+
+    Texts are kept in one sorted list; a prefix lookup is a binary search for
+    the range of matching texts. Prefixes matching more than scan_limit texts
+    get their ranked results precomputed, so every lookup ranks at most
+    scan_limit entries.
+    """
+
+    def __init__(self, entries, scan_limit=256, max_results=50):
+        self.scan_limit = scan_limit
+        self.max_results = max_results
+        self.targets = []  # (type, key, label, weight) of every case and article
+        target_ids = {}
+        rows = []
+        for text, entry_type, key, label, weight in entries:
+            target = target_ids.get((entry_type, key))
+            if target is None:
+                target = target_ids[(entry_type, key)] = len(self.targets)
+                self.targets.append((entry_type, key, label, weight))
+            rows.append((normalize(text), target))
+        rows.sort()
+        self.texts = [text for text, _ in rows]
+        self.text_targets = [target for _, target in rows]
+        self.precomputed = {}
+        self.precompute()
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f), **kwargs)
+
+    def rank(self, lo, hi, k):
+        # Distinct targets of texts[lo:hi] by descending weight
+        targets = set(self.text_targets[lo:hi])
+        return sorted(targets, key=lambda target: (-self.targets[target][3], self.targets[target][2]))[:k]
+
+    def precompute(self):
+        depth = 0
+        while True:
+            found = False
+            start = 0
+            while start < len(self.texts):
+                if len(self.texts[start]) < depth:
+                    # Its prefixes were handled at lower depths
+                    start += 1
+                    continue
+                prefix = self.texts[start][:depth]
+                end = bisect_left(self.texts, prefix + '\uffff', start)
+                if end - start > self.scan_limit:
+                    self.precomputed[prefix] = self.rank(start, end, self.max_results)
+                    found = True
+                start = end
+            if not found:
+                break
+            depth += 1
+
+    def range(self, prefix):
+        lo = bisect_left(self.texts, prefix)
+        return lo, bisect_left(self.texts, prefix + '\uffff', lo)
+
+    def complete(self, query, k=10):
+        """Return (results, precomputed) for the top k cases and articles matching the query."""
+        prefix = normalize(query)
+        ranked = self.precomputed.get(prefix)
+        precomputed = ranked is not None
+        if ranked is None:
+            lo, hi = self.range(prefix)
+            ranked = self.rank(lo, hi, k)
+        results = [
+            {'type': entry_type, 'key': key, 'label': label, 'weight': weight}
+            for entry_type, key, label, weight in (self.targets[target] for target in ranked[:k])
+        ]
+        return results, precomputed
+
+class IndexFile:
+    """PrefixIndex of an index file that is reloaded when the file changes.
+
+    The file's mtime is checked on every get(), so an index written by a load
+    that finishes after the service started is picked up without a restart.
+    Until the file exists, get() returns None; if a new version cannot be read,
+    the previous index is kept.
+    """
+
+    def __init__(self, path, **kwargs):
+        self.path = path
+        self.kwargs = kwargs
+        self.index = None
+        self.mtime = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return self.index
+        if mtime != self.mtime:
+            with self.lock:
+                if mtime != self.mtime:
+                    try:
+                        self.index = PrefixIndex.from_file(self.path, **self.kwargs)
+                    except (OSError, ValueError) as e:
+                        print(f"Could not load the autocomplete index {self.path}: {e}")
+                    self.mtime = mtime
+        return self.index
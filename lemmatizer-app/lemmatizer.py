@@ -1,27 +1,81 @@
-from flask import Flask, request, jsonify
+import os
+import time
+from flask import Flask, request, jsonify, g
 import spacy
 from elasticsearch import Elasticsearch
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from autocomplete import IndexFile
 
 app = Flask(__name__)
 
+# Prometheus metrics, served on /metrics
+REQUESTS = Counter('lemmatizer_requests_total', 'Requests handled', ['route', 'method', 'status'])
+REQUEST_LATENCY = Histogram('lemmatizer_request_duration_seconds', 'Request latency', ['route'],
+                            buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 300))
+INPUT_SIZE = Histogram('lemmatizer_input_characters', 'Characters of text passed to spaCy', ['route'],
+                       buckets=(10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 500000))
+STAGE_LATENCY = Histogram('lemmatizer_stage_duration_seconds', 'Time spent in spaCy and Elasticsearch calls',
+                          ['route', 'stage'],
+                          buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30))
+IN_FLIGHT = Gauge('lemmatizer_requests_in_flight', 'Requests currently being handled')
+AUTOCOMPLETE_LOOKUPS = Counter('lemmatizer_autocomplete_lookups_total',
+                               'Autocomplete lookups, by whether the ranking was precomputed', ['precomputed'])
+
+def route_label():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+@app.before_request
+def start_request_timer():
+    g.start_time = time.perf_counter()
+    IN_FLIGHT.inc()
+
+@app.after_request
+def record_request_metrics(response):
+    route = route_label()
+    REQUESTS.labels(route, request.method, response.status_code).inc()
+    REQUEST_LATENCY.labels(route).observe(time.perf_counter() - g.start_time)
+    return response
+
+@app.teardown_request
+def finish_request(exception):
+    if 'start_time' in g:
+        IN_FLIGHT.dec()
+
+def timed(stage, function, *args, **kwargs):
+    # Run function and record its duration as a stage of the current route
+    start_time = time.perf_counter()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        STAGE_LATENCY.labels(route_label(), stage).observe(time.perf_counter() - start_time)
+
+def run_nlp(text):
+    INPUT_SIZE.labels(route_label()).observe(len(text))
+    return timed('nlp', nlp, text)
+
 # Load spaCy's German language model
 nlp = spacy.load('de_core_news_lg')
 
 # Elasticsearch client
 es = Elasticsearch("http://elasticsearch:9200")
 
+# Autocomplete index for case numbers, Aktenzeichen and names, built by load_autocomplete.py.
+# Reloaded whenever the loader writes a new version of the file.
+AUTOCOMPLETE_INDEX = os.environ.get('AUTOCOMPLETE_INDEX', 'autocomplete_index.json')
+autocomplete_index_file = IndexFile(AUTOCOMPLETE_INDEX)
+
 # Function to lemmatize text using spaCy
 
 @app.route('/lemmatize', methods=['POST'])
 def lemmatize_text():
     data = request.json  # Assuming the request body is JSON
     text = data.get('text', '')  # Get the 'text' from the request body
-    doc = nlp(text)
+    doc = run_nlp(text)
     return {"lemmatized_text": " ".join([token.lemma_ for token in doc])}
 
 
 def lemmatize_text_es(text):
-    doc = nlp(text)
+    doc = run_nlp(text)
     return " ".join([token.lemma_ for token in doc])
 
 @app.route('/lemmatize-cases', methods=['GET'])
@@ -33,7 +87,7 @@ def lemmatize_and_update_cases():
         }
     }
     
-    cases = es.search(index='cases', body=es_query)
+    cases = timed('es_search', es.search, index='cases', body=es_query)
 
     for case in cases['hits']['hits']:
         lemmatized_name = lemmatize_text_es(case["_source"]["caseName"])
@@ -43,7 +97,7 @@ def lemmatize_and_update_cases():
         lemmatized_headnotes = lemmatize_text_es(case["_source"]["headnotes"])
 
         # Update the document in Elasticsearch with lemmatized fields
-        es.update(index='cases', id=case["_id"], body={
+        timed('es_update', es.update, index='cases', id=case["_id"], body={
             "doc": {
                 "name_lemma": lemmatized_name,
                 "facts_lemma": lemmatized_facts,
@@ -66,21 +120,21 @@ def lemmatize_and_update_articles():
         }
     }
     
-    articles = es.search(index='articles', body=es_query)
+    articles = timed('es_search', es.search, index='articles', body=es_query)
 
     for article in articles['hits']['hits']:
         lemmatized_name = lemmatize_text_es(article["_source"]["name"])
         lemmatized_text = lemmatize_text_es(article["_source"]["text"])
 
         # Update the document in Elasticsearch with lemmatized fields
-        es.update(index='articles', id=article["_id"], body={
+        timed('es_update', es.update, index='articles', id=article["_id"], body={
             "doc": {
                 "name_lemma": lemmatized_name,
                 "text_lemma": lemmatized_text,
             }
         })
     
-    es.indices.refresh(index='articles')
+    timed('es_refresh', es.indices.refresh, index='articles')
 
     return "lemmatized and updated articles"
 
@@ -93,24 +147,40 @@ def lemmatize_and_update_references():
         }
     }
     
-    references = es.search(index='references', body=es_query)
+    references = timed('es_search', es.search, index='references', body=es_query)
 
     for reference in references['hits']['hits']:
         lemmatized_context = lemmatize_text_es(reference["_source"]["context"])
         lemmatized_text = lemmatize_text_es(reference["_source"]["text"])
 
         # Update the document in Elasticsearch with lemmatized fields
-        es.update(index='references', id=reference["_id"], body={
+        timed('es_update', es.update, index='references', id=reference["_id"], body={
             "doc": {
                 "context_lemma": lemmatized_context,
                 "text_lemma": lemmatized_text,
             }
         })
     
-    es.indices.refresh(index='references')
+    timed('es_refresh', es.indices.refresh, index='references')
 
     return "lemmatized and updated references"
 
+@app.route('/autocomplete', methods=['GET'])
+def autocomplete():
+    autocomplete_index = autocomplete_index_file.get()
+    if autocomplete_index is None:
+        return jsonify({"error": "autocomplete index not available"}), 503
+    query = request.args.get('q', '')
+    # At least one and at most the precomputed number of results
+    k = max(1, min(request.args.get('k', 10, type=int), autocomplete_index.max_results))
+    results, precomputed = autocomplete_index.complete(query, k)
+    AUTOCOMPLETE_LOOKUPS.labels(str(precomputed).lower()).inc()
+    return jsonify({"results": results})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+
 if __name__ == '__main__':
     # Run the Flask server on port 5000
     app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,62 @@
+import os
+import sys
+import tracemalloc
+
+# Make the loader scripts importable when run from the project folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+from load_bverfge import get_valid_filenames, parse_bverfg
+
+# Rebuild the dict layout parse_bverfg used to return: one list entry per
+# reference occurrence and no shared strings between decisions
+def to_legacy_dict(case):
+    return {
+        'id': case.id,
+        'headnotes': case.headnotes,
+        'judgment': case.judgment,
+        'facts': case.facts,
+        'reasoning': case.reasoning,
+        'gg_references': [''.join(ref) for ref, count in case.gg_references for _ in range(count)],
+        'bverfge_references': [''.join(ref) for ref, count in case.bverfge_references for _ in range(count)],
+        'number': case.number,
+        'year': ''.join(case.year),
+        'decision_type': ''.join(case.decision_type),
+        'panel_of_judges': ''.join(case.panel_of_judges)
+    }
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+#function to get the memory of the long texts, which are the same in both layouts
+def text_size(cases):
+    return sum(sys.getsizeof(text) for case in cases
+               for text in (case.headnotes, case.judgment, case.facts, case.reasoning))
+
+def main():
+    bverfg_directory = './data/Wendel_Korpus_BVerfG/xml/'
+    csv_path = './data/Metadaten2.7.1.csv'
+
+    valid_filenames = get_valid_filenames(csv_path)
+    # Warm up once, so caches filled by the first parse are not counted for either layout
+    parse_bverfg(bverfg_directory, valid_filenames)
+
+    # Both layouts are built from fresh parser output inside the measurement, so
+    # everything they keep alive is counted, including the reference tuples
+    cases, record_size = measure(lambda: parse_bverfg(bverfg_directory, valid_filenames))
+    _, legacy_size = measure(lambda: [to_legacy_dict(case) for case in parse_bverfg(bverfg_directory, valid_filenames)])
+
+    # Only the record overhead differs between the layouts
+    texts = text_size(cases)
+    record_size -= texts
+    legacy_size -= texts
+
+    print(f"{len(cases)} decisions parsed, {texts / 1024 / 1024:.2f} MiB of texts not counted below")
+    print(f"dict records:    {legacy_size / 1024 / 1024:.2f} MiB")
+    print(f"BVerfGCase:      {record_size / 1024 / 1024:.2f} MiB ({record_size / legacy_size:.0%} of dict records)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import sys
+from collections import Counter
+
+# Make the loader scripts importable when run from the project folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+from load_bverfge import BVerfGCase, CaseEdgeTracker
+
+def make_case(case_id, number, references=()):
+    return BVerfGCase(id=case_id, headnotes='', judgment='', facts='', reasoning='', gg_references=(),
+                      bverfge_references=tuple((reference, 1) for reference in references),
+                      number=number, year='', decision_type='', panel_of_judges='')
+
+def edges(ready):
+    return sorted((edge['from_id'], edge['to_id']) for edge in ready)
+
+def write(tracker, *cases):
+    # Parse one file per case, then write all cases as one batch, like the pipeline does
+    for case in cases:
+        tracker.file_parsed(case.number, 1)
+    return edges(tracker.written(cases))
+
+# Each check returns a list of failure messages
+def check_cited_after_citing():
+    tracker = CaseEdgeTracker(Counter(['N1', 'N2']))
+    failures = []
+    if write(tracker, make_case('a', 'N1', ['N2'])) != []:
+        failures.append("edge released before the cited case was written")
+    if write(tracker, make_case('b', 'N2')) != [('a', 'N2')]:
+        failures.append("edge not released when the cited case was written")
+    return failures
+
+def check_cited_before_citing():
+    tracker = CaseEdgeTracker(Counter(['N1', 'N2']))
+    write(tracker, make_case('b', 'N2'))
+    if write(tracker, make_case('a', 'N1', ['N2'])) != [('a', 'N2')]:
+        return ["edge to an already written case not released"]
+    return []
+
+def check_self_citation():
+    tracker = CaseEdgeTracker(Counter(['N1', 'N2']))
+    ready = write(tracker, make_case('a', 'N1', ['N1', 'N2']), make_case('b', 'N2', ['N1']))
+    if ready != [('a', 'N1'), ('a', 'N2'), ('b', 'N1')]:
+        return [f"edges within one batch: {ready}"]
+    return []
+
+def check_duplicate_number():
+    # Two files with number N2, the second one arrives after the citing case
+    tracker = CaseEdgeTracker(Counter(['N1', 'N2', 'N2']))
+    failures = []
+    write(tracker, make_case('b1', 'N2'))
+    if write(tracker, make_case('a', 'N1', ['N2'])) != [('a', 'N2')]:
+        failures.append("edge to the first case with the number not released")
+    if 'N2' not in tracker.edges_to:
+        failures.append("edges dropped while a file with the number is left")
+    if write(tracker, make_case('b2', 'N2')) != [('a', 'N2')]:
+        failures.append("edge not handed out again for the later case with the number")
+    if 'N2' in tracker.edges_to:
+        failures.append("edges kept after all cases with the number were written")
+    if write(tracker, make_case('c', 'N1', ['N2'])) != [('c', 'N2')] or 'N2' in tracker.edges_to:
+        failures.append("edge to a completed number not released right away without being kept")
+    return failures
+
+def check_unknown_number():
+    tracker = CaseEdgeTracker(Counter(['N1']))
+    if write(tracker, make_case('a', 'N1', ['N9'])) != [] or tracker.edges_to:
+        return ["edge to a number without a file kept or released"]
+    return []
+
+def main():
+    checks = [check_cited_after_citing, check_cited_before_citing, check_self_citation,
+              check_duplicate_number, check_unknown_number]
+    failures = 0
+    for check in checks:
+        for message in check():
+            failures += 1
+            print(f"{check.__name__}: {message}")
+    print(f"{len(checks)} CaseEdgeTracker checks run, {failures} failures")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import os
+import sys
+import tempfile
+
+# Make the loader scripts importable when run from the project folder
+PROJECT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(PROJECT_DIRECTORY, 'scripts'))
+
+# Same fixture corpus as check_parser_equivalence.py; it has a file with two
+# decisions that share their case id
+FIXTURE_DIRECTORY = os.path.join(PROJECT_DIRECTORY, 'fixtures', 'bverfg')
+
+from case_text_store import CaseTextStore, encode_case
+from load_bverfge import case_text_sections, get_valid_filenames, parse_bverfg
+
+def check(text_store, cases, text_keys):
+    """Return the number of cases whose texts cannot be read back from the store."""
+    failures = 0
+    expected_by_id = {}
+    for case, text_key in zip(cases, text_keys):
+        sections = case_text_sections(case)
+        expected_by_id.setdefault(case.id, []).append(sections)
+        if text_store.get_sections_by_key(text_key) != sections:
+            failures += 1
+            print(f"{case.id}: texts stored under {text_key} differ")
+    for case_id, expected in expected_by_id.items():
+        if text_store.get_sections(case_id) != expected:
+            failures += 1
+            print(f"{case_id}: get_sections does not return the texts of all {len(expected)} decisions")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the CaseTextStore returns the texts of every decision")
+    parser.add_argument('--xml-directory', default=os.path.join(FIXTURE_DIRECTORY, 'xml'))
+    parser.add_argument('--metadata', default=os.path.join(FIXTURE_DIRECTORY, 'Metadaten.csv'))
+    args = parser.parse_args()
+
+    cases = parse_bverfg(args.xml_directory, get_valid_filenames(args.metadata))
+    shared_ids = len(cases) - len({case.id for case in cases})
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Sequential loader
+        text_store = CaseTextStore(os.path.join(directory, 'sequential.sqlite'))
+        text_keys = [text_store.put_case(case.id, case_text_sections(case)) for case in cases]
+        failures = check(text_store, cases, text_keys)
+        text_store.close()
+
+        # Pipelined loader: encoded by the parsers, written in batches
+        text_store = CaseTextStore(os.path.join(directory, 'pipelined.sqlite'))
+        encoded = [encode_case(case_text_sections(case)) for case in cases]
+        text_store.put_encoded_cases([(case.id, text_key, blobs) for case, (text_key, blobs) in zip(cases, encoded)])
+        failures += check(text_store, cases, [text_key for text_key, _ in encoded])
+        text_store.close()
+
+    print(f"{len(cases)} decisions checked ({shared_ids} sharing a case id with an earlier one), {failures} failures")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import argparse
+import os
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+
+# Make the loader scripts importable when run from the project folder
+PROJECT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(PROJECT_DIRECTORY, 'scripts'))
+
+# Small corpus with the section layouts the parser has to handle: absatz and
+# plain text sections, empty sections, rubrum fallback, nested sections,
+# several decisions per file and a broken file
+FIXTURE_DIRECTORY = os.path.join(PROJECT_DIRECTORY, 'fixtures', 'bverfg')
+
+import load_bverfge
+from corpus_archive import ArchiveMember, open_archive, pack_corpus
+from load_bverfge import (BVerfGCase, REF_PATTERN, BVERFG_PATTERN, count_references,
+                          get_valid_filenames, iter_bverfg_files, remove_empty_paragraph, remove_gruende,
+                          transform_string)
+
+# Reference implementation: the previous parser with one findall per section,
+# always on the standard library backend
+def itertext_html(element):
+    return '<p>' + '</p><p>'.join(element.itertext()) + '</p>'
+
+def parse_reference_root(xml_file):
+    if isinstance(xml_file, ArchiveMember):
+        return ET.fromstring(bytes(open_archive(xml_file.archive_path).get(xml_file.name)))
+    return ET.parse(xml_file).getroot()
+
+def parse_bverfg_file_findall(xml_file, file_info):
+    cases = []
+    try:
+        root = parse_reference_root(xml_file)
+    except ET.ParseError as e:
+        print(f"Error parsing {xml_file}: {e}")
+        return cases
+
+    for decision in root.findall('.//entscheidung'):
+        case_id = file_info['aktenzeichen']
+        case_number = transform_string(file_info['fundstelle'])
+        year = file_info['jahr']
+        decision_type = file_info['entscheidungsart']
+        panel_of_judges = file_info['spruchkoerper']
+
+        case_text_facts = []
+        case_text_reasoning = []
+        gg_references = []
+        bverfge_references = []
+        case_judgment = []
+        case_headnotes = []
+
+        # Extract headnotes
+        # Extract leitsätze or fallback to rubrum if no leitsätze are available
+        leitsaetze_text = []  # To store leitsätze or fallback rubrum text
+        leitsaetze = decision.findall('.//leitsaetze')
+
+        if leitsaetze:
+            # Process leitsätze
+            for leitsatz in leitsaetze:
+                if leitsatz is not None:
+                    l_text = []
+                    
+                    # Check for 'absatz' elements within leitsatz
+                    absatz_elements = leitsatz.findall('.//absatz')
+                    if absatz_elements:
+                        for absatz in absatz_elements:
+                            if absatz.text:
+                                l_text.append(itertext_html(absatz))
+                    elif leitsatz.text or ''.join(leitsatz.itertext()).strip():  # Check if leitsatz has text without 'absatz'
+                        l_text.append(itertext_html(leitsatz))
+                    
+                    if l_text:  # Ensure l_text is not empty before joining
+                        leitsaetze_text.append("".join(l_text))
+        else:
+            # No leitsätze available, extract from rubrum
+            rubrum = decision.find('.//rubrum')
+            if rubrum is not None:
+                r_text = []
+                german_note = "<p><b>Hinweis:</b> Keine Leitsätze verfügbar. Stattdessen zeigen wir den Rubrum-Text:</p>"
+                r_text.append(german_note)
+                
+                # Check for 'absatz' elements within rubrum
+                absatz_elements = rubrum.findall('.//absatz')
+                if absatz_elements:
+                    for absatz in absatz_elements:
+                        if absatz.text:
+                            r_text.append(itertext_html(absatz))
+                elif rubrum.text or ''.join(rubrum.itertext()):  # Check if rubrum has text without 'absatz'
+                    r_text.append(itertext_html(rubrum))
+                
+                if r_text:  # Ensure r_text is not empty before joining
+                    leitsaetze_text.append("".join(r_text))
+
+        # Append the extracted text to case_headnotes if any text was found
+        if leitsaetze_text:
+            case_headnotes.append("".join(leitsaetze_text))
+
+        # Extract judgment
+        for tenor in decision.findall('.//tenor'):
+            if tenor is not None:
+                t_text = []
+                
+                # Check for 'absatz' elements
+                absatz_elements = tenor.findall('.//absatz')
+                if absatz_elements:
+                    for absatz in absatz_elements:
+                        if absatz.text:
+                            t_text.append(itertext_html(absatz))
+                elif tenor.text or ''.join(tenor.itertext()):  # Check if tenor has text without 'absatz'
+                    t_text.append(itertext_html(tenor))
+
+                if t_text:  # Ensure t_text is not empty before joining
+                    tenor_text = "".join(t_text)
+                    case_judgment.append(tenor_text)
+
+        # Extract case text and references
+        for paragraph in decision.findall('.//gruende//absatz'):
+            if paragraph is not None and paragraph.text:
+                paragraph_text=remove_gruende(itertext_html(paragraph))
+
+                tbeg_attr = paragraph.get('tbeg')
+                if tbeg_attr == 'tb':
+                    case_text_facts.append(paragraph_text)
+                elif tbeg_attr == 'eg':
+                    case_text_reasoning.append(paragraph_text)
+
+                # Extract references to GG articles using regex
+                for ref in REF_PATTERN.findall(paragraph_text):
+                    gg_references.append(ref[0])
+                for ref in BVERFG_PATTERN.findall(paragraph_text):
+                    bverfge_references.append(ref.replace(" ", ""))
+
+        # Extract references from headnotes
+        for headnote_text in case_headnotes:
+            for ref in REF_PATTERN.findall(headnote_text):
+                gg_references.append(ref[0])
+            for ref in BVERFG_PATTERN.findall(headnote_text):
+                bverfge_references.append(ref.replace(" ", ""))
+
+        cases.append(BVerfGCase(
+            id=case_id,
+            headnotes=' '.join(case_headnotes),
+            judgment=' '.join(case_judgment),
+            facts=remove_empty_paragraph(' '.join(case_text_facts)),
+            reasoning=remove_empty_paragraph(' '.join(case_text_reasoning)),
+            gg_references=count_references(gg_references),
+            bverfge_references=count_references(bverfge_references),
+            number=case_number,
+            year=sys.intern(year),
+            decision_type=sys.intern(decision_type),
+            panel_of_judges=sys.intern(panel_of_judges)
+        ))
+
+    return cases
+
+def check(bverfg_directory, valid_filenames):
+    """Compare both parsers on every file; returns (decisions checked, files that differ, parsed cases)."""
+    checked = 0
+    mismatches = 0
+    cases = {}
+    for xml_file, file_info in iter_bverfg_files(bverfg_directory, valid_filenames):
+        expected = parse_bverfg_file_findall(xml_file, file_info)
+        actual = load_bverfge.parse_bverfg_file(xml_file, file_info)
+        checked += len(expected)
+        cases[file_info['dateiname']] = actual
+        if actual != expected:
+            mismatches += 1
+            print(f"Mismatch in {xml_file}")
+    return checked, mismatches, cases
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the BVerfG parser against the previous findall based parser")
+    parser.add_argument('--xml-directory', default=os.path.join(FIXTURE_DIRECTORY, 'xml'),
+                        help="corpus directory, e.g. ./data/Wendel_Korpus_BVerfG/xml/ (default: the fixture corpus)")
+    parser.add_argument('--metadata', default=os.path.join(FIXTURE_DIRECTORY, 'Metadaten.csv'),
+                        help="metadata CSV, e.g. ./data/Metadaten2.7.1.csv (default: the fixture corpus)")
+    parser.add_argument('--backend', choices=load_bverfge.XML_BACKENDS, default='etree',
+                        help="XML backend of the parser under test; the reference parser always uses etree")
+    args = parser.parse_args()
+    load_bverfge.set_xml_backend(args.backend)
+
+    valid_filenames = get_valid_filenames(args.metadata)
+    checked, mismatches, cases = check(args.xml_directory, valid_filenames)
+    if not checked:
+        print(f"No decisions found in {args.xml_directory}")
+        sys.exit(1)
+
+    # The same files read from a corpus archive must give the same records
+    with tempfile.TemporaryDirectory() as directory:
+        archive_path = os.path.join(directory, 'corpus.pack')
+        pack_corpus(args.xml_directory, args.metadata, archive_path)
+        archive_checked, archive_mismatches, archive_cases = check(archive_path, valid_filenames)
+        open_archive(archive_path).close()
+    if archive_cases != cases:
+        archive_mismatches += 1
+        print("Records read from the corpus archive differ from the directory")
+
+    print(f"{checked} decisions checked with the {args.backend} backend, {mismatches} files differ")
+    print(f"{archive_checked} decisions checked from a corpus archive, {archive_mismatches} files differ")
+    if mismatches or archive_mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
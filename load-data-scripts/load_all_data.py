@@ -6,25 +6,32 @@ Created on Mon Jul 22 01:16:22 2024
 @author: sabine
 """
 
+import argparse
 import subprocess
+import sys
 import time
 import traceback
 import os
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from case_selection import add_selection_arguments
+from loading_options import add_loading_arguments
+
 # List of scripts to run with their descriptions
 scripts = [
     ("load_gg.py", "# Grundgesetz"),
     ("load_bverfge.py", "# Urteile des Bundesverfassungsgerichts"),
     ("load_names.py", "# Namensgebung für einige berühmte Urteile des Bundesverfassungsgerichts"),
-    ("load_textbooks.py", "# Lehrbücher, die sich auf die obigen Daten beziehen können und mehr Kontextwissen enthalten")
+    ("load_textbooks.py", "# Lehrbücher, die sich auf die obigen Daten beziehen können und mehr Kontextwissen enthalten"),
+    ("load_autocomplete.py", "# Autocomplete-Index für Fundstellen, Aktenzeichen und Namen")
 ]
 
-def run_script(script, description, scripts_directory):
+def run_script(script, description, scripts_directory, args=()):
     try:
         print(description)
         start_time = time.time()
         script_path = os.path.join(scripts_directory, script)
-        subprocess.run(["python", script_path], check=True)
+        subprocess.run(["python", script_path, *args], check=True)
         end_time = time.time()
         elapsed_time = end_time - start_time
         print(f"Script {script} ran successfully in {elapsed_time:.2f} seconds.\n")
@@ -35,12 +42,27 @@ def run_script(script, description, scripts_directory):
         quit()
 
 def main():
+    # Subset and loading options are validated here and passed on to load_bverfge.py;
+    # the later scripts restrict themselves to the cases that are in the graph.
+    # Abbreviations are disabled, so that every option is forwarded under its full name.
+    parser = argparse.ArgumentParser(description="Load all data into Neo4j", allow_abbrev=False)
+    add_selection_arguments(parser)
+    add_loading_arguments(parser)
+    parser.add_argument('--citation-pages', action='store_true',
+                        help="store the first page of every citation list on the Article and Case nodes")
+    args = parser.parse_args()
+    bverfge_args = [arg for arg in sys.argv[1:] if arg != '--citation-pages']
+
     # Get the absolute path to the current directory and then to the scripts directory
     current_directory = os.path.dirname(os.path.abspath(__file__))
     scripts_directory = os.path.join(current_directory, 'scripts')
 
     for script, description in scripts:
-        run_script(script, description, scripts_directory)
+        script_args = bverfge_args if script == "load_bverfge.py" else ()
+        run_script(script, description, scripts_directory, script_args)
+
+    if args.citation_pages:
+        run_script("load_citation_pages.py", "# Erste Seite der Zitationslisten für Artikel und Urteile", scripts_directory)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,83 @@
+import argparse
+import random
+import re
+from typing import NamedTuple
+
+# Selection of the BVerfG decisions to load, used to bring up small but
+# representative environments. An empty selection loads the whole corpus.
+class CaseSelection(NamedTuple):
+    first_year: int = None
+    last_year: int = None
+    spruchkoerper: frozenset = frozenset()
+    entscheidungsart: frozenset = frozenset()
+    sample: float = None
+    seed: int = 0
+    numbers: frozenset = frozenset()
+
+    def is_empty(self):
+        return self == CaseSelection()
+
+    def filter(self, rows):
+        """Yield the metadata rows matching the selection, in their original order."""
+        rng = random.Random(self.seed)
+        for row in rows:
+            if self.first_year is not None and int(row['jahr']) < self.first_year:
+                continue
+            if self.last_year is not None and int(row['jahr']) > self.last_year:
+                continue
+            if self.spruchkoerper and row['spruchkoerper'] not in self.spruchkoerper:
+                continue
+            if self.entscheidungsart and row['entscheidungsart'] not in self.entscheidungsart:
+                continue
+            if self.numbers and normalize_number(row['fundstelle']) not in self.numbers:
+                continue
+            if self.sample is not None and rng.random() >= self.sample:
+                continue
+            yield row
+
+#function to bring "BVerfGE 7, 198" and "BVerfGE 7, 198-230" into the Case.number format,
+#same as transform_string in load_bverfge
+def normalize_number(number):
+    return re.sub(r'-\d+', '', re.sub(r'\s+', '', number))
+
+#argparse type for "1951-1960", "1990-", "-1960" and "2001"
+def year_range(value):
+    try:
+        if '-' not in value:
+            return int(value), int(value)
+        first, last = value.split('-', 1)
+        return int(first) if first else None, int(last) if last else None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid year range: {value}")
+
+#argparse type for --sample
+def fraction(value):
+    try:
+        value = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid fraction: {value}")
+    if not 0 < value <= 1:
+        raise argparse.ArgumentTypeError("the sample fraction must be in (0, 1]")
+    return value
+
+def add_selection_arguments(parser):
+    group = parser.add_argument_group('subset loading', 'Load only part of the BVerfG corpus')
+    group.add_argument('--years', type=year_range, help="year or year range, e.g. 1951-1960, 1990- or 2001")
+    group.add_argument('--spruchkoerper', action='append', default=[], help="spruchkoerper to load, can be repeated")
+    group.add_argument('--entscheidungsart', action='append', default=[], help="entscheidungsart to load, can be repeated")
+    group.add_argument('--sample', type=fraction, help="random fraction of the decisions to load, e.g. 0.05")
+    group.add_argument('--seed', type=int, default=0, help="seed for --sample")
+    group.add_argument('--numbers', nargs='+', default=[], help='BVerfGE numbers to load, e.g. "BVerfGE 7, 198"')
+    return group
+
+def selection_from_args(args):
+    first_year, last_year = args.years or (None, None)
+    return CaseSelection(
+        first_year=first_year,
+        last_year=last_year,
+        spruchkoerper=frozenset(args.spruchkoerper),
+        entscheidungsart=frozenset(args.entscheidungsart),
+        sample=args.sample,
+        seed=args.seed,
+        numbers=frozenset(normalize_number(number) for number in args.numbers)
+    )
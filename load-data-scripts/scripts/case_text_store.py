@@ -0,0 +1,128 @@
+import hashlib
+import sqlite3
+import zlib
+
+# zstd is used when the zstandard package is installed, zlib otherwise.
+# The codec is stored with every blob, so stores written with either stay readable
+# as long as the codec is available.
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Long Case fields that are kept in the side store instead of on the Case node
+TEXT_SECTIONS = ('headnotes', 'judgment', 'facts', 'reasoning', 'gg_references', 'bverfge_references')
+
+def compress(data):
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=10).compress(data)
+    return 'zlib', zlib.compress(data, 9)
+
+def decompress(codec, data):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("the zstandard package is required to read zstd compressed texts")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown codec {codec}")
+
+#function to derive the text_key of a case from its section keys
+def make_text_key(section_keys):
+    return hashlib.sha256("\n".join(section_keys).encode('utf-8')).hexdigest()
+
+def encode_case(sections):
+    """Hash and compress the sections of a case without touching the store.
+
+    Returns (text_key, blobs) with a (key, codec, data) blob per section, to be
+    written with CaseTextStore.put_encoded_cases. Being independent of the
+    store, it can run in the parser processes.
+    """
+    blobs = []
+    for section in TEXT_SECTIONS:
+        data = sections[section].encode('utf-8')
+        blobs.append((hashlib.sha256(data).hexdigest(), *compress(data)))
+    return make_text_key([key for key, _, _ in blobs]), blobs
+
+class CaseTextStore:
+    """Compressed, content-addressed store for the long texts of Case nodes.
+
+    Every section text is stored once under the sha256 of its content. A case's
+    text_key addresses the set of its section keys, and is the only text related
+    property kept on the Case node, so get_sections_by_key reads the texts of a
+    Case node. A corpus file can hold several decisions with the same case id
+    (Aktenzeichen); get_sections returns the texts of all of them.
+    """
+
+    def __init__(self, path):
+        # The pipelined loader writes from a dedicated thread
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (key TEXT PRIMARY KEY, codec TEXT NOT NULL, data BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS texts (text_key TEXT PRIMARY KEY, headnotes TEXT, judgment TEXT, facts TEXT,
+                                              reasoning TEXT, gg_references TEXT, bverfge_references TEXT);
+            CREATE TABLE IF NOT EXISTS case_texts (case_id TEXT NOT NULL, text_key TEXT NOT NULL,
+                                                   PRIMARY KEY (case_id, text_key));
+            """
+        )
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def put_blob(self, text):
+        data = text.encode('utf-8')
+        key = hashlib.sha256(data).hexdigest()
+        if self.connection.execute("SELECT 1 FROM blobs WHERE key = ?", (key,)).fetchone() is None:
+            codec, compressed = compress(data)
+            self.connection.execute("INSERT INTO blobs (key, codec, data) VALUES (?, ?, ?)", (key, codec, compressed))
+        return key
+
+    def get_blob(self, key):
+        row = self.connection.execute("SELECT codec, data FROM blobs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return decompress(row[0], row[1]).decode('utf-8')
+
+    def put_case(self, case_id, sections):
+        # sections maps every name in TEXT_SECTIONS to its text
+        section_keys = [self.put_blob(sections[section]) for section in TEXT_SECTIONS]
+        text_key = make_text_key(section_keys)
+        self.put_text_key(case_id, text_key, section_keys)
+        return text_key
+
+    def put_text_key(self, case_id, text_key, section_keys):
+        self.connection.execute(
+            f"INSERT OR IGNORE INTO texts (text_key, {', '.join(TEXT_SECTIONS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [text_key] + section_keys
+        )
+        self.connection.execute("INSERT OR IGNORE INTO case_texts (case_id, text_key) VALUES (?, ?)", (case_id, text_key))
+
+    def put_encoded_cases(self, encoded_cases):
+        # encoded_cases holds (case_id, text_key, blobs) as returned by encode_case
+        for case_id, text_key, blobs in encoded_cases:
+            self.connection.executemany("INSERT OR IGNORE INTO blobs (key, codec, data) VALUES (?, ?, ?)", blobs)
+            self.put_text_key(case_id, text_key, [key for key, _, _ in blobs])
+
+    def get_sections(self, case_id, sections=TEXT_SECTIONS):
+        """Return a list with a dict of the requested sections for every decision with the case id.
+
+        The decisions are in the order they were stored; the list is empty for an unknown case id.
+        """
+        rows = self.connection.execute(
+            "SELECT text_key FROM case_texts WHERE case_id = ? ORDER BY rowid", (case_id,)
+        ).fetchall()
+        return [self.get_sections_by_key(row[0], sections) for row in rows]
+
+    def get_sections_by_key(self, text_key, sections=TEXT_SECTIONS):
+        """Return a dict of the requested sections for the text_key of a Case node, or None for an unknown key."""
+        unknown = [section for section in sections if section not in TEXT_SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown sections {unknown}")
+        row = self.connection.execute(
+            f"SELECT {', '.join(sections)} FROM texts WHERE text_key = ?", (text_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {section: self.get_blob(key) for section, key in zip(sections, row)}
@@ -0,0 +1,107 @@
+import argparse
+import io
+import json
+import mmap
+import os
+import struct
+from typing import NamedTuple
+
+# Archive layout:
+#   MAGIC | member data ... | index (utf-8 JSON) | index offset (8 bytes) | index length (8 bytes) | MAGIC
+# The index maps every member name to its (offset, length). XML files are
+# stored under their dateiname, the metadata CSV under METADATA_MEMBER.
+MAGIC = b'TENJIPK1'
+FOOTER = struct.Struct('<QQ')
+METADATA_MEMBER = '__metadata__'
+
+class ArchiveMember(NamedTuple):
+    """Reference to a file in a corpus archive; picklable, so it can be passed to parser processes."""
+    archive_path: str
+    name: str
+
+    def __str__(self):
+        return f"{self.archive_path}:{self.name}"
+
+class CorpusArchive:
+    """Read-only, memory-mapped view of a corpus archive."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.data = memoryview(self.mmap)
+        size = len(self.mmap)
+        footer_start = size - FOOTER.size - len(MAGIC)
+        if self.mmap[:len(MAGIC)] != MAGIC or self.mmap[size - len(MAGIC):] != MAGIC:
+            raise ValueError(f"{path} is not a corpus archive")
+        index_offset, index_length = FOOTER.unpack_from(self.mmap, footer_start)
+        # Member names in the order they were packed
+        self.index = json.loads(bytes(self.data[index_offset:index_offset + index_length]).decode('utf-8'))
+
+    def close(self):
+        self.data.release()
+        self.mmap.close()
+
+    def names(self):
+        return [name for name in self.index if name != METADATA_MEMBER]
+
+    def get(self, name):
+        """Return the content of a member as a zero-copy memoryview of the mapped file."""
+        offset, length = self.index[name]
+        return self.data[offset:offset + length]
+
+    def open_metadata(self):
+        return io.TextIOWrapper(io.BytesIO(self.get(METADATA_MEMBER)), encoding='utf-8', newline='')
+
+# Archives opened by this process, shared by all parses (and by forked parser workers)
+_open_archives = {}
+
+def open_archive(path):
+    archive = _open_archives.get(path)
+    if archive is None:
+        archive = _open_archives[path] = CorpusArchive(path)
+    return archive
+
+def is_archive(path):
+    if not os.path.isfile(path):
+        return False
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+def pack_corpus(xml_directory, metadata_csv, archive_path):
+    """Pack the corpus XML files and the metadata CSV into one archive file."""
+    index = {}
+    with open(archive_path, 'wb') as archive:
+        archive.write(MAGIC)
+
+        def add(name, path):
+            with open(path, 'rb') as f:
+                content = f.read()
+            index[name] = (archive.tell(), len(content))
+            archive.write(content)
+
+        add(METADATA_MEMBER, metadata_csv)
+        for filename in os.listdir(xml_directory):
+            if filename.endswith(".xml"):
+                # Same dateiname as iter_bverfg_files in load_bverfge derives from the file name
+                add(filename.rstrip(".xml"), os.path.join(xml_directory, filename))
+
+        index_data = json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        index_offset = archive.tell()
+        archive.write(index_data)
+        archive.write(FOOTER.pack(index_offset, len(index_data)))
+        archive.write(MAGIC)
+    return len(index) - 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the BVerfG corpus into a single archive file")
+    parser.add_argument('--xml-directory', default='./data/Wendel_Korpus_BVerfG/xml/')
+    parser.add_argument('--metadata', default='./data/Metadaten2.7.1.csv')
+    parser.add_argument('--archive', default='./data/bverfg_corpus.pack')
+    args = parser.parse_args()
+
+    count = pack_corpus(args.xml_directory, args.metadata, args.archive)
+    print(f"{count} decisions packed into {args.archive}")
+
+if __name__ == "__main__":
+    main()
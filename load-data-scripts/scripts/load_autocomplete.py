@@ -0,0 +1,93 @@
+import json
+import os
+from neo4j import GraphDatabase
+
+class LegalGraph:
+    def __init__(self, uri, user, password):
+        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+
+    def close(self):
+        self.driver.close()
+
+    def get_cases(self):
+        with self.driver.session() as session:
+            result = session.run(
+                """
+                MATCH (c:Case)
+                OPTIONAL MATCH (c)-[:IS_NAMED]->(n:Name)
+                RETURN c.number AS number, c.id AS id, c.citing_cases AS citing_cases,
+                       collect(DISTINCT n.short) AS names
+                """
+            )
+            return [record.data() for record in result]
+
+    def get_articles(self):
+        with self.driver.session() as session:
+            result = session.run(
+                """
+                MATCH (a:Article)
+                OPTIONAL MATCH (a)-[:IS_NAMED]->(n:Name)
+                RETURN a.number AS number, a.citing_cases AS citing_cases, collect(DISTINCT n.short) AS names
+                """
+            )
+            return [record.data() for record in result]
+
+#function to add the starts of all words of a name, so "Lüth" also finds "Urteil Lüth"
+def name_suffixes(name):
+    words = name.split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+def build_entries(cases, articles):
+    """Return the autocomplete entries as [text, type, key, label, weight] lists."""
+    entries = []
+    for case in cases:
+        if not case['number']:
+            continue
+        names = [name for name in case['names'] if name]
+        label = f"{case['number']} - {case['id']}" if case['id'] else case['number']
+        if names:
+            label = f"{label} ({names[0]})"
+        weight = case['citing_cases'] or 0
+        texts = [case['number']]
+        if case['id']:
+            texts.append(case['id'])
+        for name in names:
+            texts.extend(name_suffixes(name))
+        for text in dict.fromkeys(texts):
+            entries.append([text, 'case', case['number'], label, weight])
+
+    for article in articles:
+        if not article['number']:
+            continue
+        names = [name for name in article['names'] if name]
+        label = f"Art. {article['number']} GG ({names[0]})" if names else f"Art. {article['number']} GG"
+        weight = article['citing_cases'] or 0
+        texts = [f"Art. {article['number']} GG", f"Artikel {article['number']} GG"]
+        for name in names:
+            texts.extend(name_suffixes(name))
+        for text in dict.fromkeys(texts):
+            entries.append([text, 'article', article['number'], label, weight])
+    return entries
+
+def main():
+    # Output file, served by the /autocomplete endpoint of the lemmatizer service
+    index_file = './data/autocomplete_index.json'
+
+    # Connect to Neo4j
+    uri = "bolt://localhost:7687"  # Adjust the URI if needed
+    user = "neo4j"
+    password = "huproject"  # Use your actual Neo4j password
+    graph = LegalGraph(uri, user, password)
+
+    entries = build_entries(graph.get_cases(), graph.get_articles())
+    # Write to a temporary file first, so the running lemmatizer never reloads a partial index
+    with open(index_file + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(index_file + ".tmp", index_file)
+    print(f"{len(entries)} autocomplete entries written to {index_file}")
+
+    # Close the graph connection
+    graph.close()
+
+if __name__ == "__main__":
+    main()
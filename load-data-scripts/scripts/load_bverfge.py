@@ -9,26 +9,85 @@ Created on Mon Jul 22 01:09:09 2024
 import os
 import re
 import csv
+import sys
+import asyncio
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import Counter
+from typing import NamedTuple
 import xml.etree.ElementTree as ET
-from neo4j import GraphDatabase
+
+from neo4j import GraphDatabase, AsyncGraphDatabase
+from case_text_store import CaseTextStore, encode_case
+from case_selection import add_selection_arguments, selection_from_args
+from loading_options import add_loading_arguments
+from corpus_archive import ArchiveMember, is_archive, open_archive
+
+# XML backend for the corpus: 'etree' (standard library) or 'lxml', chosen with
+# --xml-backend or the BVERFG_XML_BACKEND environment variable. set_xml_backend
+# also sets the variable, so parser processes use the same backend.
+XML_BACKEND_VARIABLE = 'BVERFG_XML_BACKEND'
+XML_BACKENDS = ('etree', 'lxml')
+
+def set_xml_backend(backend):
+    global etree, LXML_PARSER, text_nodes, PARSE_ERRORS
+    if backend not in XML_BACKENDS:
+        raise ValueError(f"Unknown XML backend {backend}, expected one of {', '.join(XML_BACKENDS)}")
+    os.environ[XML_BACKEND_VARIABLE] = backend
+    if backend == 'lxml':
+        from lxml import etree
+        # Drop comments and processing instructions like ElementTree does
+        LXML_PARSER = etree.XMLParser(remove_comments=True, remove_pis=True, huge_tree=True)
+        # Same non-empty text nodes as itertext(), collected in C
+        text_nodes = etree.XPath('.//text()', smart_strings=False)
+        PARSE_ERRORS = (ET.ParseError, etree.XMLSyntaxError)
+    else:
+        etree = None
+        LXML_PARSER = None
+        text_nodes = ET.Element.itertext
+        PARSE_ERRORS = ET.ParseError
+
+set_xml_backend(os.environ.get(XML_BACKEND_VARIABLE, 'etree'))
+
+# Compact record for a parsed decision. References are stored as interned
+# (reference, count) pairs in order of first occurrence instead of one list
+# entry per occurrence.
+class BVerfGCase(NamedTuple):
+    id: str
+    headnotes: str
+    judgment: str
+    facts: str
+    reasoning: str
+    gg_references: tuple
+    bverfge_references: tuple
+    number: str
+    year: str
+    decision_type: str
+    panel_of_judges: str
 
 # Function to parse the CSV file and get valid filenames
-def get_valid_filenames(csv_path):
-    valid_filenames = []
+# An optional CaseSelection restricts the result before any XML file is opened
+def get_valid_filenames(csv_path, selection=None):
     with open(csv_path, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile, delimiter='\t')
-        for row in reader:
-            if row['fundstelle'] != 'NA':
-                valid_filenames.append({
-                    'dateiname': row['dateiname'],
-                    'aktenzeichen': row['aktenzeichen'],
-                    'fundstelle': row['fundstelle'],
-                    'jahr': row['jahr'],
-                    'monat': row['monat'],
-                    'tag': row['tag'],
-                    'entscheidungsart': row['entscheidungsart'],
-                    'spruchkoerper': row['spruchkoerper']
-                })
+        return read_valid_filenames(csvfile, selection)
+
+def read_valid_filenames(csvfile, selection=None):
+    valid_filenames = []
+    reader = csv.DictReader(csvfile, delimiter='\t')
+    rows = (row for row in reader if row['fundstelle'] != 'NA')
+    if selection is not None:
+        rows = selection.filter(rows)
+    for row in rows:
+        valid_filenames.append({
+            'dateiname': row['dateiname'],
+            'aktenzeichen': row['aktenzeichen'],
+            'fundstelle': row['fundstelle'],
+            'jahr': row['jahr'],
+            'monat': row['monat'],
+            'tag': row['tag'],
+            'entscheidungsart': row['entscheidungsart'],
+            'spruchkoerper': row['spruchkoerper']
+        })
     return valid_filenames
 
 #function to normalize the references to bverfge into a standard format
@@ -40,176 +99,220 @@ def transform_string(s):
     return s
 
 #function to remove the string "Gründe:" or "G r ü n d e :" which was often at the beginning
+GRUENDE_PATTERN = re.compile(r'(?i)^[\s<p>\n\r]*g\s*r\s*ü\s*n\s*d\s*e\s*(?:<p>|:\n|</p>|[ \t])*')
 def remove_gruende(text):
-    return re.sub(r'(?i)^[\s<p>\n\r]*g\s*r\s*ü\s*n\s*d\s*e\s*(?:<p>|:\n|</p>|[ \t])*', '', text)
+    return GRUENDE_PATTERN.sub('', text)
 
 #function to remove empty paragraphs resulting from using remove_gruende
+EMPTY_PARAGRAPH_PATTERN = re.compile(r'<p>\s*</p>')
 def remove_empty_paragraph(text):
-    return re.sub(r'<p>\s*</p>', '', text)
+    return EMPTY_PARAGRAPH_PATTERN.sub('', text)
+
+#function to render the text of an element as html paragraphs
+def element_html(element):
+    return '<p>' + '</p><p>'.join(text_nodes(element)) + '</p>'
+
+#function to turn a list of references into interned (reference, count) pairs
+def count_references(references):
+    return tuple((sys.intern(ref), count) for ref, count in Counter(references).items())
+
+#function to expand (reference, count) pairs into the semicolon separated node property
+def join_references(reference_counts):
+    return ";".join(";".join([ref] * count) for ref, count in reference_counts)
+
+#function to collect the long texts of a case for the CaseTextStore
+def case_text_sections(case):
+    return {
+        'headnotes': case.headnotes,
+        'judgment': case.judgment,
+        'facts': case.facts,
+        'reasoning': case.reasoning,
+        'gg_references': join_references(case.gg_references),
+        'bverfge_references': join_references(case.bverfge_references)
+    }
+
+#define important regexes for relationship detection
+REF_PATTERN = re.compile(r'Art\.?\s*(\d+[a-zA-Z]*)\s*Abs\.?\s*(\d+[a-zA-Z]*)?\s*(Satz\s*\d+)?\s*GG')
+BVERFG_PATTERN = re.compile(r'(BVerfGE\s?\d{1,3},?\s?\d{1,3})')
 
 # Step 1: Parse the BVerfG XML File and Extract Legal Cases
-def parse_bverfg(bverfg_directory, valid_filenames):
-    cases = []
-    valid_file_dict = {f['dateiname']: f for f in valid_filenames}
-
-    #define important regexes for relationship detection
-    ref_pattern = re.compile(r'Art\.?\s*(\d+[a-zA-Z]*)\s*Abs\.?\s*(\d+[a-zA-Z]*)?\s*(Satz\s*\d+)?\s*GG')
-    bverfg_pattern = re.compile(r'(BVerfGE\s?\d{1,3},?\s?\d{1,3})')
- 
+def iter_bverfg_files(bverfg_directory, valid_filenames):
+    """Yield (xml_file, metadata row) for every corpus file listed in the metadata.
 
+    bverfg_directory may also be a corpus archive written by corpus_archive.py,
+    in which case the xml files are ArchiveMembers.
+    """
+    valid_file_dict = {f['dateiname']: f for f in valid_filenames}
+    if is_archive(bverfg_directory):
+        for name in open_archive(bverfg_directory).names():
+            if name in valid_file_dict:
+                yield ArchiveMember(bverfg_directory, name), valid_file_dict[name]
+        return
     for filename in list(os.listdir(bverfg_directory)):
         if filename.endswith(".xml"):
             base_filename = filename.rstrip(".xml")
             if base_filename not in valid_file_dict:
                 continue
-
-            xml_file = os.path.join(bverfg_directory, filename)
-            try:
-                tree = ET.parse(xml_file)
-                root = tree.getroot()
-            except ET.ParseError as e:
-                print(f"Error parsing {xml_file}: {e}")
-                continue
-
-            for decision in root.findall('.//entscheidung'):
-                case_id = valid_file_dict[base_filename]['aktenzeichen']
-                case_number = transform_string(valid_file_dict[base_filename]['fundstelle'])
-                year = valid_file_dict[base_filename]['jahr']
-                decision_type = valid_file_dict[base_filename]['entscheidungsart']
-                panel_of_judges = valid_file_dict[base_filename]['spruchkoerper']
-
-                case_text_facts = []
-                case_text_reasoning = []
-                gg_references = []
-                bverfge_references = []
-                case_judgment = []
-                case_headnotes = []
-
-                # Extract headnotes
-                # Extract leitsätze or fallback to rubrum if no leitsätze are available
-                leitsaetze_text = []  # To store leitsätze or fallback rubrum text
-                leitsaetze = decision.findall('.//leitsaetze')
-
-                if leitsaetze:
-                    # Process leitsätze
-                    for leitsatz in leitsaetze:
-                        if leitsatz is not None:
-                            l_text = []
-                            
-                            # Check for 'absatz' elements within leitsatz
-                            absatz_elements = leitsatz.findall('.//absatz')
-                            if absatz_elements:
-                                for absatz in absatz_elements:
-                                    if absatz.text:
-                                        l_text.append('<p>')
-                                        l_text.append('</p><p>'.join(absatz.itertext()))
-                                        l_text.append('</p>')
-                            elif leitsatz.text or ''.join(leitsatz.itertext()).strip():  # Check if leitsatz has text without 'absatz'
-                                l_text.append('<p>')
-                                l_text.append('</p><p>'.join(leitsatz.itertext()))
-                                l_text.append('</p>')
-                            
-                            if l_text:  # Ensure l_text is not empty before joining
-                                leitsaetze_text.append("".join(l_text))
-                else:
-                    # No leitsätze available, extract from rubrum
-                    rubrum = decision.find('.//rubrum')
-                    if rubrum is not None:
-                        r_text = []
-                        german_note = "<p><b>Hinweis:</b> Keine Leitsätze verfügbar. Stattdessen zeigen wir den Rubrum-Text:</p>"
-                        r_text.append(german_note)
-                        
-                        # Check for 'absatz' elements within rubrum
-                        absatz_elements = rubrum.findall('.//absatz')
-                        if absatz_elements:
-                            for absatz in absatz_elements:
-                                if absatz.text:
-                                    r_text.append('<p>')
-                                    r_text.append('</p><p>'.join(absatz.itertext()))
-                                    r_text.append('</p>')
-                        elif rubrum.text or ''.join(rubrum.itertext()):  # Check if rubrum has text without 'absatz'
-                            r_text.append('<p>')
-                            r_text.append('</p><p>'.join(rubrum.itertext()))
-                            r_text.append('</p>')
-                        
-                        if r_text:  # Ensure r_text is not empty before joining
-                            leitsaetze_text.append("".join(r_text))
-
-                # Append the extracted text to case_headnotes if any text was found
-                if leitsaetze_text:
-                    case_headnotes.append("".join(leitsaetze_text))
-
-                # Extract judgment
-                for tenor in decision.findall('.//tenor'):
-                    if tenor is not None:
-                        t_text = []
-                        
-                        # Check for 'absatz' elements
-                        absatz_elements = tenor.findall('.//absatz')
-                        if absatz_elements:
-                            for absatz in absatz_elements:
-                                if absatz.text:
-                                    t_text.append('<p>')
-                                    t_text.append('</p><p>'.join(absatz.itertext()))
-                                    t_text.append('</p>')
-                        elif tenor.text or ''.join(tenor.itertext()):  # Check if tenor has text without 'absatz'
-                            t_text.append('<p>')
-                            t_text.append('</p><p>'.join(tenor.itertext()))
-                            t_text.append('</p>')
-
-                        if t_text:  # Ensure t_text is not empty before joining
-                            tenor_text = "".join(t_text)
-                            case_judgment.append(tenor_text)
-
-                # Extract case text and references
-                for paragraph in decision.findall('.//gruende//absatz'):
-                    if paragraph is not None and paragraph.text:
-                        p_text=[]
-                        p_text.append('<p>') 
-                        p_text.append('</p><p>'.join(paragraph.itertext()))
-                        p_text.append('</p>')
-                        para_text="".join(p_text)
-                        paragraph_text=remove_gruende(para_text)
-
-                        tbeg_attr = paragraph.get('tbeg')
-                        if tbeg_attr == 'tb':
-                            case_text_facts.append(paragraph_text)
-                        elif tbeg_attr == 'eg':
-                            case_text_reasoning.append(paragraph_text)
-
-                        # Extract references to GG articles using regex
-                       for ref in ref_pattern.findall(paragraph_text):
-                            gg_references.append(ref[0])
-                        for ref in bverfg_pattern.findall(paragraph_text):
-                            bverfge_references.append(ref.replace(" ", ""))
-
-                # Extract references from headnotes
-                for headnote_text in case_headnotes:
-                    for ref in ref_pattern.findall(headnote_text):
+            yield os.path.join(bverfg_directory, filename), valid_file_dict[base_filename]
+
+def parse_xml(xml_file):
+    if isinstance(xml_file, ArchiveMember):
+        # Parse straight from the memory-mapped archive
+        content = open_archive(xml_file.archive_path).get(xml_file.name)
+        if etree is not None:
+            return etree.fromstring(bytes(content), LXML_PARSER)
+        parser = ET.XMLParser()
+        parser.feed(content)
+        return parser.close()
+    if etree is not None:
+        return etree.parse(xml_file, LXML_PARSER).getroot()
+    return ET.parse(xml_file).getroot()
+
+def collect_sections(decision):
+    """Walk a decision once and collect the absatz elements of its sections.
+
+    Returns the leitsaetze, tenor and gruende containers in document order,
+    each as (element, absatz elements in document order), plus the first
+    rubrum. This yields the same elements as the findall('.//leitsaetze'),
+    find('.//rubrum'), findall('.//tenor') and findall('.//gruende//absatz')
+    calls, including nested containers.
+    """
+    leitsaetze = []
+    tenors = []
+    gruende = []
+    rubrum = None
+    open_containers = []
+
+    def walk(element):
+        nonlocal rubrum
+        for child in element:
+            tag = child.tag
+            container = None
+            if tag == 'absatz':
+                for absatz_elements in open_containers:
+                    absatz_elements.append(child)
+            elif tag == 'leitsaetze':
+                container = []
+                leitsaetze.append((child, container))
+            elif tag == 'tenor':
+                container = []
+                tenors.append((child, container))
+            elif tag == 'gruende':
+                container = []
+                gruende.append((child, container))
+            elif tag == 'rubrum' and rubrum is None:
+                container = []
+                rubrum = (child, container)
+
+            if container is not None:
+                open_containers.append(container)
+                walk(child)
+                open_containers.pop()
+            elif len(child):
+                walk(child)
+
+    walk(decision)
+    return leitsaetze, rubrum, tenors, gruende
+
+def section_html(element, absatz_elements, buffer):
+    # Render the absatz children with text, or the whole element if it has none
+    if absatz_elements:
+        for absatz in absatz_elements:
+            if absatz.text:
+                buffer.append(element_html(absatz))
+    else:
+        buffer.append(element_html(element))
+
+def parse_bverfg_file(xml_file, file_info):
+    """Parse the decisions of a single corpus file."""
+    cases = []
+    try:
+        root = parse_xml(xml_file)
+    except PARSE_ERRORS as e:
+        print(f"Error parsing {xml_file}: {e}")
+        return cases
+
+    for decision in root.iterfind('.//entscheidung'):
+        case_id = file_info['aktenzeichen']
+        case_number = transform_string(file_info['fundstelle'])
+        year = file_info['jahr']
+        decision_type = file_info['entscheidungsart']
+        panel_of_judges = file_info['spruchkoerper']
+
+        case_text_facts = []
+        case_text_reasoning = []
+        gg_references = []
+        bverfge_references = []
+
+        leitsaetze, rubrum, tenors, gruende = collect_sections(decision)
+
+        # Extract headnotes
+        # Extract leitsätze or fallback to rubrum if no leitsätze are available
+        headnotes = []
+        if leitsaetze:
+            for leitsatz, absatz_elements in leitsaetze:
+                if absatz_elements or leitsatz.text or ''.join(leitsatz.itertext()).strip():
+                    section_html(leitsatz, absatz_elements, headnotes)
+        elif rubrum is not None:
+            element, absatz_elements = rubrum
+            headnotes.append("<p><b>Hinweis:</b> Keine Leitsätze verfügbar. Stattdessen zeigen wir den Rubrum-Text:</p>")
+            if absatz_elements or element.text or ''.join(element.itertext()):
+                section_html(element, absatz_elements, headnotes)
+        case_headnotes = "".join(headnotes)
+
+        # Extract judgment
+        case_judgment = []
+        for tenor, absatz_elements in tenors:
+            t_text = []
+            if absatz_elements or tenor.text or ''.join(tenor.itertext()):
+                section_html(tenor, absatz_elements, t_text)
+            if t_text:
+                case_judgment.append("".join(t_text))
+
+        # Extract case text and references
+        for _, absatz_elements in gruende:
+            for paragraph in absatz_elements:
+                if paragraph.text:
+                    paragraph_text=remove_gruende(element_html(paragraph))
+
+                    tbeg_attr = paragraph.get('tbeg')
+                    if tbeg_attr == 'tb':
+                        case_text_facts.append(paragraph_text)
+                    elif tbeg_attr == 'eg':
+                        case_text_reasoning.append(paragraph_text)
+
+                    # Extract references to GG articles using regex
+                    for ref in REF_PATTERN.findall(paragraph_text):
                         gg_references.append(ref[0])
-                    for ref in bverfg_pattern.findall(headnote_text):
+                    for ref in BVERFG_PATTERN.findall(paragraph_text):
                         bverfge_references.append(ref.replace(" ", ""))
 
-                # Define a regular expression pattern to match the format
-                pattern = r'BVerfGE(\d+),(\d+)'
-
-                # Use re.sub() to replace the leading zeros after the comma
-                modified_string = re.sub(pattern, lambda m: f"BVerfGE{m.group(1)},{int(m.group(2))}", filename.rstrip(".xml"))
-
-                cases.append({
-                    'id': case_id,
-                    'headnotes': ' '.join(case_headnotes),
-                    'judgment': ' '.join(case_judgment),
-                    'facts': remove_empty_paragraph(' '.join(case_text_facts)),
-                    'reasoning': remove_empty_paragraph(' '.join(case_text_reasoning)),
-                    'gg_references': gg_references,
-                    'bverfge_references': bverfge_references,
-                    'number': case_number,
-                    'year': year,
-                    'decision_type': decision_type,
-                    'panel_of_judges': panel_of_judges
-                })
+        # Extract references from headnotes
+        for ref in REF_PATTERN.findall(case_headnotes):
+            gg_references.append(ref[0])
+        for ref in BVERFG_PATTERN.findall(case_headnotes):
+            bverfge_references.append(ref.replace(" ", ""))
+
+        cases.append(BVerfGCase(
+            id=case_id,
+            headnotes=case_headnotes,
+            judgment=' '.join(case_judgment),
+            facts=remove_empty_paragraph(' '.join(case_text_facts)),
+            reasoning=remove_empty_paragraph(' '.join(case_text_reasoning)),
+            gg_references=count_references(gg_references),
+            bverfge_references=count_references(bverfge_references),
+            number=case_number,
+            year=sys.intern(year),
+            decision_type=sys.intern(decision_type),
+            panel_of_judges=sys.intern(panel_of_judges)
+        ))
+
+    return cases
 
+def parse_bverfg(bverfg_directory, valid_filenames):
+    cases = []
+    for xml_file, file_info in iter_bverfg_files(bverfg_directory, valid_filenames):
+        cases.extend(parse_bverfg_file(xml_file, file_info))
     return cases
 
 # Step 2: Load the Data into a Neo4j Graph Database
@@ -230,19 +333,35 @@ class LegalGraph:
                                year: $year, 
                                decision_type: $decision_type, panel_of_judges: $panel_of_judges})
                 """, 
-                id=case['id'], 
-                headnotes=case['headnotes'],
-                judgment=case['judgment'],
-                facts=case['facts'],
-                reasoning=case['reasoning'],
-                gg_references=";".join(case['gg_references']),
-                bverfge_references=";".join(case['bverfge_references']),
-                number=case['number'],
-                year=case['year'],
-                decision_type=case['decision_type'],
-                panel_of_judges=case['panel_of_judges']
+                id=case.id, 
+                headnotes=case.headnotes,
+                judgment=case.judgment,
+                facts=case.facts,
+                reasoning=case.reasoning,
+                gg_references=join_references(case.gg_references),
+                bverfge_references=join_references(case.bverfge_references),
+                number=case.number,
+                year=case.year,
+                decision_type=case.decision_type,
+                panel_of_judges=case.panel_of_judges
             )
     
+    def create_case_metadata_node(self, case, text_key):
+        # Long texts live in the CaseTextStore; the node only keeps its text_key
+        with self.driver.session() as session:
+            session.run(
+                """
+                MERGE (c:Case {id: $id, number: $number, year: $year, decision_type: $decision_type,
+                               panel_of_judges: $panel_of_judges, text_key: $text_key})
+                """, 
+                id=case.id, 
+                number=case.number,
+                year=case.year,
+                decision_type=case.decision_type,
+                panel_of_judges=case.panel_of_judges,
+                text_key=text_key
+            )
+
     def create_reference_relationship(self, from_case, to_id):
         with self.driver.session() as session:
             session.run(
@@ -270,26 +389,24 @@ class LegalGraph:
         with self.driver.session() as session:
             # Update REFERS_TO relationships between Case and Article nodes
             for case in cases:
-                gg_references_count = {ref: case['gg_references'].count(ref) for ref in set(case['gg_references'])}
-                for ref, count in gg_references_count.items():
+                for ref, count in case.gg_references:
                     session.run(
                         """
                         MATCH (a:Case {id: $from_id})-[r:REFERS_TO]->(b:Article {number: $to_id})
                         SET r.number_of_references = $count
                         """,
-                        from_id=case['id'],
+                        from_id=case.id,
                         to_id=ref,
                         count=count
                     )
                 
-                bverfge_references_count = {ref: case['bverfge_references'].count(ref) for ref in set(case['bverfge_references'])}
-                for ref, count in bverfge_references_count.items():
+                for ref, count in case.bverfge_references:
                     session.run(
                         """
                         MATCH (a:Case {number: $from_id})-[r:REFERS_TO]->(b:Case {number: $to_id})
                         SET r.number_of_references = $count
                         """,
-                        from_id=case['number'],
+                        from_id=case.number,
                         to_id=ref,
                         count=count
                     )
@@ -333,46 +450,298 @@ class LegalGraph:
                 """
             )
 
+# Step 2b: Pipelined loading. Parser processes feed a bounded queue that is
+# drained in batches by concurrent async Neo4j sessions.
+class AsyncLegalGraph:
+    def __init__(self, uri, user, password):
+        self.driver = AsyncGraphDatabase.driver(uri, auth=(user, password))
+
+    async def close(self):
+        await self.driver.close()
+
+    @staticmethod
+    async def _run(tx, query, rows):
+        result = await tx.run(query, rows=rows)
+        await result.consume()
+
+    async def create_case_nodes(self, session, rows):
+        await session.execute_write(self._run,
+            """
+            UNWIND $rows AS row
+            MERGE (c:Case {id: row.id, headnotes: row.headnotes, judgment: row.judgment, 
+                           facts: row.facts, reasoning: row.reasoning, gg_references: row.gg_references, 
+                           bverfge_references: row.bverfge_references, number: row.number, 
+                           year: row.year, 
+                           decision_type: row.decision_type, panel_of_judges: row.panel_of_judges})
+            """, rows)
+
+    async def create_case_metadata_nodes(self, session, rows):
+        await session.execute_write(self._run,
+            """
+            UNWIND $rows AS row
+            MERGE (c:Case {id: row.id, number: row.number, year: row.year, decision_type: row.decision_type,
+                           panel_of_judges: row.panel_of_judges, text_key: row.text_key})
+            """, rows)
+
+    async def create_reference_relationships(self, session, rows):
+        await session.execute_write(self._run,
+            """
+            UNWIND $rows AS row
+            MATCH (a:Case {id: row.from_id})
+            MATCH (b:Article {number: row.to_id})
+            MERGE (a)-[r:REFERS_TO]->(b)
+            SET r.number_of_references = row.count
+            """, rows)
+
+    async def create_case_relationships(self, session, rows):
+        await session.execute_write(self._run,
+            """
+            UNWIND $rows AS row
+            MATCH (a:Case {id: row.from_id})
+            MATCH (b:Case {number: row.to_id})
+            MERGE (a)-[r:REFERS_TO]->(b)
+            SET r.number_of_references = row.count
+            """, rows)
+
+class CaseEdgeTracker:
+    """Release Case to Case edges once both endpoints have been written.
+
+    Article nodes are loaded before the decisions, so only the cited Case has to
+    be waited for. Several decisions can share a number, so the edges to a number
+    are kept as (from_id, count) pairs and handed out again for every later case
+    with that number; the MERGE of the write query makes the repeated edges to
+    earlier cases no-ops. This links all cases with the number, like the MATCH of
+    the sequential loader.
+
+    file_numbers counts the corpus files per case number. Once all files of a
+    number are parsed and all their cases written, the number cannot show up
+    again: its kept edges are dropped and later edges to it are written without
+    being kept. Edges to numbers without a file are dropped right away, as the
+    MATCH of the sequential loader would not find their target either. So only
+    the edges to numbers that are still being loaded are held in memory.
+    """
+
+    def __init__(self, file_numbers):
+        self.files_left = dict(file_numbers)
+        self.cases_left = dict.fromkeys(self.files_left, 0)
+        self.written_numbers = set()
+        self.edges_to = {}
+
+    def file_parsed(self, number, case_count):
+        # Called for every file before its cases are handed to the writers
+        self.files_left[number] -= 1
+        self.cases_left[number] += case_count
+        self._drop_if_complete(number)
+
+    def _drop_if_complete(self, number):
+        if not self.files_left[number] and not self.cases_left[number]:
+            self.edges_to.pop(number, None)
+
+    def written(self, cases):
+        # Returns the edges that became writable through the given cases
+        ready = []
+        for case in cases:
+            self.written_numbers.add(case.number)
+            self.cases_left[case.number] -= 1
+            ready.extend({'from_id': from_id, 'to_id': case.number, 'count': count}
+                         for from_id, count in self.edges_to.get(case.number, ()))
+        for case in cases:
+            for ref, count in case.bverfge_references:
+                if ref not in self.files_left:
+                    continue
+                if ref in self.written_numbers:
+                    ready.append({'from_id': case.id, 'to_id': ref, 'count': count})
+                if self.files_left[ref] or self.cases_left[ref]:
+                    self.edges_to.setdefault(ref, []).append((case.id, count))
+        for case in cases:
+            self._drop_if_complete(case.number)
+        return ready
+
+#function run in the parser processes when the long texts go to the CaseTextStore:
+#hashing and compression happen here, only the metadata is sent on to the writers
+def parse_bverfg_file_encoded(xml_file, file_info):
+    return [
+        (case._replace(headnotes='', judgment='', facts='', reasoning=''), encode_case(case_text_sections(case)))
+        for case in parse_bverfg_file(xml_file, file_info)
+    ]
+
+async def produce_cases(files, queue, edges, parser_workers, encode_texts):
+    # Queue items are (case, encode_case result); the latter is None without a text store
+    loop = asyncio.get_running_loop()
+    # At most two files per worker are in flight; when the queue is full the
+    # producer stops submitting new files until the writers catch up
+    in_flight = asyncio.Semaphore(parser_workers * 2)
+
+    async def parse_one(pool, xml_file, file_info):
+        try:
+            if encode_texts:
+                items = await loop.run_in_executor(pool, parse_bverfg_file_encoded, xml_file, file_info)
+            else:
+                items = [(case, None) for case in await loop.run_in_executor(pool, parse_bverfg_file, xml_file, file_info)]
+            edges.file_parsed(transform_string(file_info['fundstelle']), len(items))
+            for item in items:
+                await queue.put(item)
+        finally:
+            in_flight.release()
+
+    with ProcessPoolExecutor(max_workers=parser_workers) as pool:
+        tasks = []
+        try:
+            for xml_file, file_info in files:
+                await in_flight.acquire()
+                tasks.append(asyncio.ensure_future(parse_one(pool, xml_file, file_info)))
+            await asyncio.gather(*tasks)
+        finally:
+            # Only has an effect when the producer is cancelled or a parse failed
+            for task in tasks:
+                task.cancel()
+
+async def write_cases(graph, queue, edges, batch_size, text_store, store_executor):
+    loop = asyncio.get_running_loop()
+    async with graph.driver.session() as session:
+        done = False
+        while not done:
+            items = []
+            item = await queue.get()
+            while item is not None:
+                items.append(item)
+                if len(items) >= batch_size or queue.empty():
+                    break
+                item = queue.get_nowait()
+            done = item is None
+            if not items:
+                continue
+            batch = [case for case, _ in items]
+
+            if text_store:
+                # The texts were hashed and compressed by the parsers; the SQLite
+                # writes run on the store thread to keep the event loop free
+                await loop.run_in_executor(store_executor, text_store.put_encoded_cases, [
+                    (case.id, text_key, blobs) for case, (text_key, blobs) in items
+                ])
+                rows = [{
+                    'id': case.id,
+                    'number': case.number,
+                    'year': case.year,
+                    'decision_type': case.decision_type,
+                    'panel_of_judges': case.panel_of_judges,
+                    'text_key': text_key
+                } for case, (text_key, _) in items]
+                await graph.create_case_metadata_nodes(session, rows)
+            else:
+                rows = [dict(case._asdict(), **{
+                    'gg_references': join_references(case.gg_references),
+                    'bverfge_references': join_references(case.bverfge_references)
+                }) for case in batch]
+                await graph.create_case_nodes(session, rows)
+
+            await graph.create_reference_relationships(session, [
+                {'from_id': case.id, 'to_id': ref, 'count': count}
+                for case in batch for ref, count in case.gg_references
+            ])
+            # Edges are only handed out after the batch has been committed
+            ready = edges.written(batch)
+            for i in range(0, len(ready), batch_size):
+                await graph.create_case_relationships(session, ready[i:i + batch_size])
+
+async def run_pipeline(bverfg_directory, valid_filenames, uri, user, password, parser_workers=4,
+                       writer_sessions=4, batch_size=200, queue_size=1000, text_store=None):
+    graph = AsyncLegalGraph(uri, user, password)
+    queue = asyncio.Queue(maxsize=queue_size)
+    files = list(iter_bverfg_files(bverfg_directory, valid_filenames))
+    edges = CaseEdgeTracker(Counter(transform_string(file_info['fundstelle']) for _, file_info in files))
+    # All CaseTextStore writes go through one thread, as SQLite allows one writer
+    store_executor = ThreadPoolExecutor(max_workers=1) if text_store else None
+
+    async def produce():
+        await produce_cases(files, queue, edges, parser_workers, text_store is not None)
+        for _ in range(writer_sessions):
+            await queue.put(None)
+
+    # The producer and the writers run side by side, so that a failing writer
+    # raises here instead of leaving the producer blocked on the full queue
+    tasks = [asyncio.ensure_future(produce())]
+    tasks.extend(asyncio.ensure_future(write_cases(graph, queue, edges, batch_size, text_store, store_executor))
+                 for _ in range(writer_sessions))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if store_executor:
+            store_executor.shutdown()
+        await graph.close()
+
 def main():
+    parser = argparse.ArgumentParser(description="Load the BVerfG decisions into Neo4j")
+    add_selection_arguments(parser)
+    add_loading_arguments(parser)
+    args = parser.parse_args()
+    selection = selection_from_args(args)
+    if args.xml_backend:
+        set_xml_backend(args.xml_backend)
+
     # Paths to the directories and files
     bverfg_directory = './data/Wendel_Korpus_BVerfG/xml/'  # Update with your directory path
     csv_path = './data/Metadaten2.7.1.csv'  # Path to the CSV file
+    text_store_path = args.text_store
+    corpus_archive_path = args.corpus_archive
+
+    # Get valid filenames, restricted to the selected decisions
+    if corpus_archive_path:
+        bverfg_directory = corpus_archive_path
+        with open_archive(corpus_archive_path).open_metadata() as csvfile:
+            valid_filenames = read_valid_filenames(csvfile, selection)
+    else:
+        valid_filenames = get_valid_filenames(csv_path, selection)
+    if not selection.is_empty():
+        print(f"Loading a subset of {len(valid_filenames)} decisions")
 
-    # Get valid filenames
-    valid_filenames = get_valid_filenames(csv_path)
-
-    # Parse the XML files
-    bverfg_cases = parse_bverfg(bverfg_directory, valid_filenames)
-    
     # Connect to Neo4j
     uri = "bolt://localhost:7687"  # Adjust the URI if needed
     user = "neo4j"
     password = "huproject"  # Use your actual Neo4j password
     graph = LegalGraph(uri, user, password)
-    
-    # Create Case nodes and Reference relationships
-    for case in bverfg_cases:
-        graph.create_case_node(case)
+    text_store = CaseTextStore(text_store_path) if text_store_path else None
+
+    if args.pipelined:
+        # Case nodes, REFERS_TO relationships and their number_of_references are written by the pipeline
+        asyncio.run(run_pipeline(bverfg_directory, valid_filenames, uri, user, password, args.parser_workers,
+                                 args.writer_sessions, args.batch_size, args.queue_size, text_store))
+    else:
+        # Parse the XML files
+        bverfg_cases = parse_bverfg(bverfg_directory, valid_filenames)
+
+        # Create Case nodes and Reference relationships
+        for case in bverfg_cases:
+            if text_store:
+                text_key = text_store.put_case(case.id, case_text_sections(case))
+                graph.create_case_metadata_node(case, text_key)
+            else:
+                graph.create_case_node(case)
+            
+            # Create relationships for references
+            for reference, _ in case.gg_references:
+                graph.create_reference_relationship(case.id, reference)
         
-        # Create relationships for references
-        for reference in case['gg_references']:
-            graph.create_reference_relationship(case['id'], reference)
-    
-    for case in bverfg_cases:
-        for reference in case['bverfge_references']:
-            graph.create_case_relationship(case['id'], reference)
+        for case in bverfg_cases:
+            for reference, _ in case.bverfge_references:
+                graph.create_case_relationship(case.id, reference)
+
+        # Update the REFERS_TO relationships with the number_of_references property
+        graph.update_relationship_properties(bverfg_cases)
  
     # Initialize node attributes for all Case and Article nodes
     graph.initialize_node_attributes()
-    
-    # Update the REFERS_TO relationships with the number_of_references property
-    graph.update_relationship_properties(bverfg_cases)
 
     # Update Article and Case nodes with total_case_citations and citing_cases
     graph.update_node_attributes()
     
     # Close the graph connection
     graph.close()
+    if text_store:
+        text_store.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,236 @@
+import argparse
+import json
+from neo4j import GraphDatabase
+
+# Number of rows of the first page of each citation list in the client
+PAGE_SIZE = 10
+
+# Number of nodes per write query
+BATCH_SIZE = 500
+
+CASE_ITEM = ("{number: item.number, id: item.id, year: item.year, decision_type: item.decision_type, "
+             "panel_of_judges: item.panel_of_judges, citing_cases: item.citing_cases, "
+             "total_case_citations: item.total_case_citations, caseName: name, elementId: elementId(item)}")
+ARTICLE_ITEM = ("{number: item.number, citing_cases: item.citing_cases, total_case_citations: item.total_case_citations, "
+                "name: name, elementId: elementId(item)}")
+REFERENCE_ITEM = ("{id: item.id, text: item.text, context: item.context, resource: item.resource, "
+                  "elementId: elementId(item)}")
+
+# The citation lists of the API: (node label, list name, pattern, item map, sorted by citing_cases).
+# Sorted lists resolve their Name like the API does; the reference lists are not sorted by the API.
+CITATION_LISTS = [
+    ('Article', 'cited_by_articles', '(item:Article)-[:CITES]->(x)', ARTICLE_ITEM, True),
+    ('Article', 'citing_articles', '(x)-[:CITES]->(item:Article)', ARTICLE_ITEM, True),
+    ('Article', 'cases_citing_article', '(item:Case)-[:REFERS_TO]->(x)', CASE_ITEM, True),
+    ('Article', 'references_citing_article', '(item:Reference)-[:MENTIONS]->(x)', REFERENCE_ITEM, False),
+    ('Case', 'cited_by_cases', '(item:Case)-[:REFERS_TO]->(x)', CASE_ITEM, True),
+    ('Case', 'citing_cases', '(x)-[:REFERS_TO]->(item:Case)', CASE_ITEM, True),
+    ('Case', 'articles_citing_case', '(x)-[:REFERS_TO]->(item:Article)', ARTICLE_ITEM, True),
+    ('Case', 'references_with_case', '(item:Reference)-[:MENTIONS]->(x)', REFERENCE_ITEM, False),
+]
+
+#function to get the node properties holding a list and its total count
+def property_names(list_name):
+    return f"first_page_{list_name}", f"first_page_{list_name}_total"
+
+def list_rows_query(pattern, item, sorted_by_citations):
+    # Rows of a citation list of x, as the API returns them for the default sort
+    if sorted_by_citations:
+        return f"""
+            MATCH {pattern}
+            OPTIONAL MATCH (item)-[:IS_NAMED]->(n:Name)
+            WITH DISTINCT item, n.short AS name
+            ORDER BY item.citing_cases DESC, elementId(item)
+            """
+    return f"""
+            MATCH {pattern}
+            WITH DISTINCT item
+            ORDER BY elementId(item)
+            """
+
+def total_query(pattern, sorted_by_citations):
+    # Row count of a citation list of x, like the count queries of the API: without DISTINCT
+    return f"""
+            MATCH {pattern}
+            {'OPTIONAL MATCH (item)-[:IS_NAMED]->(n:Name)' if sorted_by_citations else ''}
+            RETURN count(item) AS total
+            """
+
+def live_rows_query(pattern, item, sorted_by_citations):
+    # All rows of a citation list of x in the order of the API query
+    if sorted_by_citations:
+        return f"""
+            MATCH {pattern}
+            OPTIONAL MATCH (item)-[:IS_NAMED]->(n:Name)
+            WITH item, n.short AS name
+            RETURN DISTINCT {item} AS row, item.citing_cases AS citing_cases
+            ORDER BY citing_cases DESC
+            """
+    return f"""
+            MATCH {pattern}
+            RETURN DISTINCT {item} AS row
+            """
+
+class LegalGraph:
+    def __init__(self, uri, user, password):
+        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+
+    def close(self):
+        self.driver.close()
+
+    def get_first_pages(self, label, pattern, item, sorted_by_citations, page_size):
+        # The API anchors every list on {number: $id}, so a list covers all nodes
+        # with the number; several decisions can share one
+        with self.driver.session() as session:
+            result = session.run(
+                f"""
+                MATCH (x:{label})
+                WHERE x.number IS NOT NULL
+                WITH x.number AS number, collect(x) AS nodes
+                CALL {{
+                    WITH nodes
+                    UNWIND nodes AS x
+                    {list_rows_query(pattern, item, sorted_by_citations)}
+                    RETURN collect({item})[..$page_size] AS items
+                }}
+                CALL {{
+                    WITH nodes
+                    UNWIND nodes AS x
+                    {total_query(pattern, sorted_by_citations)}
+                }}
+                RETURN number, [x IN nodes | elementId(x)] AS element_ids, items, total
+                """,
+                page_size=page_size
+            )
+            return [record.data() for record in result]
+
+    def set_first_pages(self, label, list_name, rows):
+        # Every node with the number gets the same page
+        items_property, total_property = property_names(list_name)
+        with self.driver.session() as session:
+            for i in range(0, len(rows), BATCH_SIZE):
+                session.run(
+                    f"""
+                    UNWIND $rows AS row
+                    UNWIND row.element_ids AS element_id
+                    MATCH (x:{label})
+                    WHERE elementId(x) = element_id
+                    SET x.{items_property} = row.items, x.{total_property} = row.total
+                    """,
+                    rows=rows[i:i + BATCH_SIZE]
+                )
+
+    def check_first_pages(self, label, list_name, pattern, item, sorted_by_citations, page_size, sample):
+        """Compare the stored first pages of sample random numbers with the live query.
+
+        Returns a list of (number, reason) for every mismatch.
+        """
+        items_property, total_property = property_names(list_name)
+        mismatches = []
+        with self.driver.session() as session:
+            numbers = session.run(
+                f"""
+                MATCH (x:{label})
+                WHERE x.number IS NOT NULL
+                WITH DISTINCT x.number AS number
+                WITH number, rand() AS r ORDER BY r LIMIT $sample
+                MATCH (x:{label} {{number: number}})
+                RETURN number, count(x) AS nodes,
+                       collect(x.{items_property}) AS items, collect(x.{total_property}) AS totals
+                """,
+                sample=sample
+            ).data()
+            for entry in numbers:
+                if len(entry['items']) < entry['nodes'] or len(entry['totals']) < entry['nodes']:
+                    mismatches.append((entry['number'], 'not precomputed'))
+                    continue
+                if len(set(entry['items'])) > 1 or len(set(entry['totals'])) > 1:
+                    mismatches.append((entry['number'], 'nodes with the number store different pages'))
+                    continue
+                stored = json.loads(entry['items'][0])
+                # Same shape as the API queries: anchored on the number, no tie
+                # breaker, count without DISTINCT
+                live = session.run(
+                    f"""
+                    MATCH (x:{label} {{number: $number}})
+                    {live_rows_query(pattern, item, sorted_by_citations)}
+                    """,
+                    number=entry['number']
+                ).data()
+                live = [record['row'] for record in live]
+                live_total = session.run(
+                    f"""
+                    MATCH (x:{label} {{number: $number}})
+                    {total_query(pattern, sorted_by_citations)}
+                    """,
+                    number=entry['number']
+                ).single()['total']
+                reason = compare_first_page(stored, entry['totals'][0], live, live_total, page_size, sorted_by_citations)
+                if reason:
+                    mismatches.append((entry['number'], reason))
+        return mismatches
+
+def compare_first_page(stored, total, live, live_total, page_size, sorted_by_citations):
+    """Return why a stored first page differs from the live rows, or None if it is correct.
+
+    The API orders by citing_cases only, so rows with equal citing_cases may come
+    in any order; only their weights and the rows above the last weight must match.
+    """
+    if total != live_total:
+        return f"total {total} != {live_total}"
+    if len(stored) != min(page_size, len(live)):
+        return f"{len(stored)} rows stored, expected {min(page_size, len(live))}"
+    if not sorted_by_citations:
+        live_ids = {row['elementId'] for row in live}
+        if not all(row['elementId'] in live_ids for row in stored):
+            return "stored rows are not in the live list"
+        return None
+
+    first_page = live[:page_size]
+    if [row['citing_cases'] for row in stored] != [row['citing_cases'] for row in first_page]:
+        return "citing_cases order differs"
+    if stored:
+        last = stored[-1]['citing_cases']
+        above = lambda rows: {(row['elementId'], row.get('name', row.get('caseName'))) for row in rows
+                              if row['citing_cases'] != last}
+        if above(stored) != above(first_page):
+            return "rows differ"
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Store the first page of every citation list on the Article and Case nodes")
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE)
+    parser.add_argument('--check', type=int, metavar='SAMPLE', default=0,
+                        help="compare the stored pages of SAMPLE random numbers per list with the live queries")
+    args = parser.parse_args()
+
+    # Connect to Neo4j
+    uri = "bolt://localhost:7687"  # Adjust the URI if needed
+    user = "neo4j"
+    password = "huproject"  # Use your actual Neo4j password
+    graph = LegalGraph(uri, user, password)
+
+    failed = False
+    for label, list_name, pattern, item, sorted_by_citations in CITATION_LISTS:
+        if args.check:
+            mismatches = graph.check_first_pages(label, list_name, pattern, item, sorted_by_citations,
+                                                 args.page_size, args.check)
+            for number, reason in mismatches:
+                print(f"{label} {number} {list_name}: {reason}")
+            failed = failed or bool(mismatches)
+            continue
+
+        rows = graph.get_first_pages(label, pattern, item, sorted_by_citations, args.page_size)
+        for row in rows:
+            row['items'] = json.dumps(row['items'], ensure_ascii=False, separators=(',', ':'))
+        graph.set_first_pages(label, list_name, rows)
+        nodes = sum(len(row['element_ids']) for row in rows)
+        print(f"{list_name}: first pages of {len(rows)} numbers stored on {nodes} {label} nodes")
+
+    # Close the graph connection
+    graph.close()
+    if failed:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,16 @@ class LegalGraph:
     def close(self):
         self.driver.close()
     
+    def get_case_numbers(self):
+        with self.driver.session() as session:
+            result = session.run("MATCH (c:Case) WHERE c.number IS NOT NULL RETURN c.number AS number")
+            return {record["number"] for record in result}
+
+    def get_article_numbers(self):
+        with self.driver.session() as session:
+            result = session.run("MATCH (a:Article) WHERE a.number IS NOT NULL RETURN a.number AS number")
+            return {record["number"] for record in result}
+
     def create_name_node(self, name):
         with self.driver.session() as session:
             session.run(
@@ -88,8 +98,16 @@ def main():
     password = "huhontow"  # Use your actual Neo4j password
     graph = LegalGraph(uri, user, password)
     
+    # Only name the cases and articles that are loaded, so subset loads stay consistent
+    case_numbers = graph.get_case_numbers()
+    article_numbers = graph.get_article_numbers()
+
     # Create Name nodes and IS_NAMED relationships
     for name in all_names:
+         if name['type'] == 'case' and name['id'] not in case_numbers:
+             continue
+         if name['type'] == 'article' and name['id'] not in article_numbers:
+             continue
          if name['type'] == 'case':
              graph.create_name_node(name)
              graph.create_is_named_relationship(name['id'],name['id'])
@@ -5,64 +5,128 @@ import traceback
 from collections import defaultdict
 from neo4j import GraphDatabase
 
+# Number of MENTIONS rows sent per UNWIND query
+BATCH_SIZE = 1000
+
+BVERFGE_PATTERN = re.compile(r'BVerfGE\s(\d+),\s(\d+)')
+GG_PATTERN = re.compile(r'Art\.?\s*(\d+[a-zA-Z]*)(,\s*(\d+[a-zA-Z]*)*)(\s*Abs\.)?\s*(\d+[a-zA-Z]*)?\s*(Satz\s*\d+)?\s*GG')
+
 def parse_toc_weblink(file):
      data_toc={}
      with open(file, "r", encoding="utf-8") as toc_weblink_file:
           reader = csv.reader(toc_weblink_file, delimiter=";", quotechar='"')
-          for row in list(reader)[1:]:
+          next(reader, None)  # Skip header
+          for row in reader:
               data_toc[row[0]]=row[1]
      return data_toc
 
+class TocTrie:
+    """In-memory trie of TOC paths; every node is emitted exactly once."""
+
+    def __init__(self):
+        self.root = {}
+        self.nodes = []
+
+    def insert(self, toc_hierarchy, weblinks):
+        # Walk the path level by level, extending the parent id instead of
+        # re-joining the whole prefix for every level
+        children = self.root
+        path_ids = []
+        for level, toc_text in enumerate(toc_hierarchy):
+            entry = children.get(toc_text)
+            if entry is None:
+                toc_id = f"{path_ids[-1]} > {toc_text}" if path_ids else toc_text
+                entry = (toc_id, {})
+                children[toc_text] = entry
+                self.nodes.append({
+                    'id': toc_id,
+                    'text': toc_text,
+                    'next_toc': path_ids[-1] if level > 0 else toc_text,  # Set next_toc to toc0 for root, otherwise parent node
+                    'weblink': weblinks.get(toc_id)
+                })
+            path_ids.append(entry[0])
+            children = entry[1]
+        return path_ids
+
 def parse_tb(directory):
     reference_data = []
-    toc_data = []
+    toc = TocTrie()
     for filename in os.listdir(directory):
         if filename.endswith(".csv") and not filename.endswith("_weblinks.csv"):
             csv_file = os.path.join(directory, filename)
-            dath = []
+            toc0 = filename.strip(".csv")
+            weblinks=parse_toc_weblink(os.path.join(directory, str(toc0+"_weblinks.csv")))
             with open(csv_file, "r", encoding="utf-8") as csvfile:
                 reader = csv.reader(csvfile, delimiter=";", quotechar='"')
-                for row in list(reader)[1:]:
-                    dath.append(row)
-            weblinks=parse_toc_weblink(os.path.join(directory, str(filename.strip(".csv")+"_weblinks.csv")))
-            for i, r in enumerate(dath):
-                reference = r[0]
-                resource = r[1]
-                context = r[4]
-                toc_levels = [r[x] for x in range(16, 4, -1)]  # TOC1 to TOC12
-                toc0 = filename.strip(".csv")
-                
-                # Get the maximum depth TOC value
-                max_depth_toc = next((toc for toc in toc_levels if toc), None)
-                toc_hierarchy = [toc for toc in [toc0] + toc_levels if toc]
-                
-                # Create reference_data node
-                full_path_ids = [f"{' > '.join(toc_hierarchy[:i+1])}" for i in range(len(toc_hierarchy))]
-                
-                reference_data.append({
-                    'id': full_path_ids[-1],  # Use the full path to current node as the ID
-                    'text': reference,
-                    'next_toc': full_path_ids[-2] if len(full_path_ids) > 1 else f"{filename.strip('.csv')}_toc0",  # Set next_toc to toc0 if no parent
-                    'context': context,
-                    'resource': resource
-                })
-                
-                # Create toc_data nodes
-                toc_path_ids = [f"{' > '.join(toc_hierarchy[:level+1])}" for level in range(len(toc_hierarchy))]
-                
-                for level, toc_text in enumerate(toc_hierarchy):
-                    next_toc = toc_path_ids[level - 1] if level > 0 else toc0
-                    if toc_path_ids[level] in weblinks:
-                        weblink=weblinks[toc_path_ids[level]]
-                    else: weblink=None
-                    toc_data.append({
-                        'id': toc_path_ids[level],
-                        'text': toc_text,
-                        'next_toc': next_toc,  # Set next_toc to toc0 for root, otherwise parent node
-                        'weblink': weblink
+                next(reader, None)  # Skip header
+                for r in reader:
+                    reference = r[0]
+                    resource = r[1]
+                    context = r[4]
+                    toc_levels = [r[x] for x in range(16, 4, -1)]  # TOC1 to TOC12
+                    toc_hierarchy = [toc for toc in [toc0] + toc_levels if toc]
+
+                    # Register the TOC path, creating only the levels not seen before
+                    full_path_ids = toc.insert(toc_hierarchy, weblinks)
+
+                    # Create reference_data node
+                    reference_data.append({
+                        'id': full_path_ids[-1],  # Use the full path to current node as the ID
+                        'text': reference,
+                        'next_toc': full_path_ids[-2] if len(full_path_ids) > 1 else f"{toc0}_toc0",  # Set next_toc to toc0 if no parent
+                        'context': context,
+                        'resource': resource
                     })
 
-    return reference_data, toc_data
+    return reference_data, toc.nodes
+
+def resolve_references(ref_data, case_numbers, article_numbers):
+    """Resolve textbook references to Case/Article keys without touching the database.
+
+    Returns the resolvable case and article MENTIONS rows (deduplicated) and a
+    list of unresolved citations.
+    """
+    case_mentions = {}
+    article_mentions = {}
+    unresolved = []
+    for tb in ref_data:
+        if tb["resource"] == "BVerfGE":
+            modified_string = re.sub(BVERFGE_PATTERN, lambda m: f"BVerfGE{m.group(1)},{int(m.group(2))}", tb["text"])
+            targets = [modified_string]
+            known, mentions = case_numbers, case_mentions
+        elif tb["resource"] == "GG":
+            targets = []
+            for ref in GG_PATTERN.findall(tb["text"]):
+                targets.append(ref[0])
+                if ref[2]:
+                    targets.append(ref[2])
+            known, mentions = article_numbers, article_mentions
+        else:
+            continue
+
+        for target in targets:
+            if target in known:
+                key = (tb['id'], tb['text'], target)
+                if key not in mentions:
+                    mentions[key] = {'from_id': tb['id'], 'text': tb['text'], 'to_id': target}
+            else:
+                unresolved.append({
+                    'id': tb['id'],
+                    'text': tb['text'],
+                    'resource': tb['resource'],
+                    'target': target
+                })
+        if not targets:
+            unresolved.append({'id': tb['id'], 'text': tb['text'], 'resource': tb['resource'], 'target': ''})
+
+    return list(case_mentions.values()), list(article_mentions.values()), unresolved
+
+def write_unresolved_report(unresolved, report_file):
+    with open(report_file, "w", newline='', encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile, delimiter=";", quotechar='"')
+        writer.writerow(['id', 'text', 'resource', 'target'])
+        for ref in unresolved:
+            writer.writerow([ref['id'], ref['text'], ref['resource'], ref['target']])
 
 class LegalGraph:
     def __init__(self, uri, user, password):
@@ -101,29 +165,48 @@ class LegalGraph:
                 traceback.print_exc()
                 print(toc)
 
-    def create_article_relationship(self, from_case, to_id):
+    def get_case_numbers(self):
         with self.driver.session() as session:
-            session.run(
-                """
-                MATCH (a:Reference {text: $from_id})
-                MATCH (b:Article {number: $to_id})
-                MERGE (a)-[:MENTIONS]->(b)
-                """, 
-                from_id=from_case, 
-                to_id=to_id
-            )
+            result = session.run("MATCH (c:Case) WHERE c.number IS NOT NULL RETURN c.number AS number")
+            return {record["number"] for record in result}
 
-    def create_case_relationship(self, from_case, to_id):
+    def get_article_numbers(self):
         with self.driver.session() as session:
-            session.run(
-                """
-                MATCH (a:Reference {text: $from_id})
-                MATCH (b:Case {number: $to_id})
-                MERGE (a)-[:MENTIONS]->(b)
-                """, 
-                from_id=from_case, 
-                to_id=to_id
-            )
+            result = session.run("MATCH (a:Article) WHERE a.number IS NOT NULL RETURN a.number AS number")
+            return {record["number"] for record in result}
+
+    def create_reference_index(self):
+        with self.driver.session() as session:
+            session.run("CREATE INDEX reference_id IF NOT EXISTS FOR (r:Reference) ON (r.id)")
+
+    def create_case_mentions(self, mentions):
+        # References sharing a TOC section share an id, so the text narrows it down
+        with self.driver.session() as session:
+            for i in range(0, len(mentions), BATCH_SIZE):
+                session.run(
+                    """
+                    UNWIND $rows AS row
+                    MATCH (a:Reference {id: row.from_id})
+                    WHERE a.text = row.text
+                    MATCH (b:Case {number: row.to_id})
+                    MERGE (a)-[:MENTIONS]->(b)
+                    """,
+                    rows=mentions[i:i + BATCH_SIZE]
+                )
+
+    def create_article_mentions(self, mentions):
+        with self.driver.session() as session:
+            for i in range(0, len(mentions), BATCH_SIZE):
+                session.run(
+                    """
+                    UNWIND $rows AS row
+                    MATCH (a:Reference {id: row.from_id})
+                    WHERE a.text = row.text
+                    MATCH (b:Article {number: row.to_id})
+                    MERGE (a)-[:MENTIONS]->(b)
+                    """,
+                    rows=mentions[i:i + BATCH_SIZE]
+                )
 
     def create_reference_relationship(self, from_case, to_id):
         with self.driver.session() as session:
@@ -152,6 +235,7 @@ class LegalGraph:
 def main():
     # Directory path to the CSV files
     directory = './data/textbooks/'  # Update with your directory path
+    unresolved_report = './data/textbooks_unresolved_references.csv'  # Report of citations without a target node
 
     # Parse the CSV files
     ref_data, toc_data = parse_tb(directory)
@@ -162,12 +246,9 @@ def main():
     password = "huhontow"  # Use your actual Neo4j password
     graph = LegalGraph(uri, user, password)
     
-    # Create TOC nodes
-    seen_toc_nodes = set()
+    # Create TOC nodes (toc_data holds every distinct TOC node once)
     for tb in toc_data:
-        if tb['id'] not in seen_toc_nodes:
-            graph.create_toc_node(tb)
-            seen_toc_nodes.add(tb['id'])
+        graph.create_toc_node(tb)
     
     # Create Reference nodes
     for tb in ref_data:
@@ -178,22 +259,21 @@ def main():
         if tb["next_toc"]:
             graph.create_toc_relationship(tb["id"], tb["next_toc"])
     
-    # Create Reference relationships and other relationships
-    bverfge_pattern = re.compile(r'BVerfGE\s(\d+),\s(\d+)')
-    gg_pattern = re.compile(r'Art\.?\s*(\d+[a-zA-Z]*)(,\s*(\d+[a-zA-Z]*)*)(\s*Abs\.)?\s*(\d+[a-zA-Z]*)?\s*(Satz\s*\d+)?\s*GG')
+    # Create Reference relationships
     for tb in ref_data:
         graph.create_reference_relationship(tb['id'], tb["id"])
-        if tb["resource"] == "BVerfGE":
-            modified_string = re.sub(bverfge_pattern, lambda m: f"BVerfGE{m.group(1)},{int(m.group(2))}", tb["text"])
-            graph.create_case_relationship(tb['text'], modified_string)
-        elif tb["resource"] == "GG":
-            gg_references = []
-            for ref in gg_pattern.findall(tb["text"]):
-                gg_references.append(ref[0])
-                if ref[2]:
-                    gg_references.append(ref[2])
-            for reference in gg_references:
-                graph.create_article_relationship(tb['text'], reference)
+
+    # Resolve MENTIONS targets in memory against the existing Case and Article nodes
+    graph.create_reference_index()
+    case_mentions, article_mentions, unresolved = resolve_references(
+        ref_data, graph.get_case_numbers(), graph.get_article_numbers())
+    graph.create_case_mentions(case_mentions)
+    graph.create_article_mentions(article_mentions)
+
+    # Report the citations that do not point to a loaded Case or Article
+    write_unresolved_report(unresolved, unresolved_report)
+    print(f"{len(case_mentions)} case and {len(article_mentions)} article mentions created, "
+          f"{len(unresolved)} unresolved citations written to {unresolved_report}")
     
     # Close the graph connection
     graph.close()
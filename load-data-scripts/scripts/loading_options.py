@@ -0,0 +1,36 @@
+import argparse
+
+#argparse type for counts that must be at least 1
+def positive_int(value):
+    try:
+        value = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid count: {value}")
+    if value < 1:
+        raise argparse.ArgumentTypeError("the value must be at least 1")
+    return value
+
+# Options of load_bverfge.py for how the decisions are read and written;
+# load_all_data.py accepts and forwards them as well
+def add_loading_arguments(parser):
+    group = parser.add_argument_group('loading', 'How the BVerfG decisions are read and written')
+    group.add_argument('--corpus-archive', metavar='PATH',
+                       help="read XML files and metadata from a corpus archive (see corpus_archive.py), "
+                            "e.g. ./data/bverfg_corpus.pack")
+    group.add_argument('--xml-backend', choices=('etree', 'lxml'),
+                       help="XML parser for the corpus (default: the BVERFG_XML_BACKEND environment variable, "
+                            "or etree, the standard library)")
+    group.add_argument('--text-store', metavar='PATH',
+                       help="keep the long case texts in a CaseTextStore instead of Neo4j, "
+                            "e.g. ./data/case_texts.sqlite")
+    group.add_argument('--pipelined', action='store_true',
+                       help="parse and write concurrently instead of parsing everything first")
+    group.add_argument('--parser-workers', type=positive_int, default=4,
+                       help="processes parsing XML files in pipelined mode (default: 4)")
+    group.add_argument('--writer-sessions', type=positive_int, default=4,
+                       help="concurrent async Neo4j sessions in pipelined mode (default: 4)")
+    group.add_argument('--batch-size', type=positive_int, default=200,
+                       help="cases per write transaction in pipelined mode (default: 200)")
+    group.add_argument('--queue-size', type=positive_int, default=1000,
+                       help="parsed cases buffered between parsers and writers in pipelined mode (default: 1000)")
+    return group